@@ -0,0 +1,215 @@
+""" Benchmark suite of the puzzle generation.
+
+Every strategy mode of :func:`strategy.get_strategy_map` (and the default strategy)
+is measured across a grid of villager/wolf/lunatic numbers with fixed seeds.
+The results are written as JSON, and compared with a saved baseline to flag regressions.
+
+```
+python benchmark.py -output bench.json
+python benchmark.py -baseline bench.json
+```
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import strategy
+from player import ClaimMatrix
+from observer import TraceObserver
+
+
+DEFAULT_GRID = [(4, 1, 1), (4, 1, 2), (5, 2, 1), (5, 2, 2), (6, 2, 2), (7, 2, 2)]
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """ Return the percentiles of ``values`` by the nearest-rank method.
+    """
+    if not values:
+        return {"p{0}".format(point): None for point in points}
+    ordered = sorted(values)
+    result = dict()
+    for point in points:
+        rank = max(1, -(-point * len(ordered) // 100))
+        result["p{0}".format(point)] = ordered[rank - 1]
+    return result
+
+
+def _summarize(latencies):
+    summary = percentiles(latencies)
+    summary["mean"] = sum(latencies) / len(latencies) if latencies else None
+    summary["runs"] = len(latencies)
+    return summary
+
+
+def _create_strategy(mode, numbers, seed):
+    return strategy.choose_strategy(mode)(*numbers, random.Random(seed))
+
+
+def _create_players(numbers):
+    return ClaimMatrix(sum(numbers)).create_players()
+
+
+def bench_generate_problem(mode, numbers, seeds, max_iteration):
+    """ Measure full runs of :func:`strategy.Strategy.generate_problem`.
+
+    :return: ``dict`` with the latency percentiles, the iterations to convergence,
+             and the failure rate (``RuntimeError``).
+    """
+    latencies = list()
+    iterations = list()
+    failures = 0
+    errors = dict()
+    for seed in seeds:
+        strategy_obj = _create_strategy(mode, numbers, seed)
+        index_to_player = _create_players(numbers)
+        trace_observer = TraceObserver()
+        start = time.perf_counter()
+        try:
+            strategy_obj.generate_problem(index_to_player, max_iteration, trace_observer)
+        except RuntimeError:
+            failures += 1
+            continue
+        except Exception as error:
+            name = type(error).__name__
+            errors[name] = errors.get(name, 0) + 1
+            continue
+        finally:
+            elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        iterations.append(trace_observer.counters["iterations"])
+
+    summary = _summarize(latencies)
+    summary["iterations"] = percentiles(iterations)
+    summary["failure_rate"] = failures / len(seeds)
+    summary["errors"] = errors
+    return summary
+
+
+def bench_coherence(mode, numbers, seeds, max_iteration):
+    """ Measure :func:`get_coherent_cases`, :func:`is_result_coherent`
+    and :func:`strategy._multiple_combination` on the states of generated problems.
+    """
+    coherent_latencies = list()
+    check_latencies = list()
+    combination_latencies = list()
+    indices = list(range(sum(numbers)))
+    for seed in seeds:
+        strategy_obj = _create_strategy(mode, numbers, seed)
+        index_to_player = _create_players(numbers)
+        try:
+            strategy_obj.generate_problem(index_to_player, max_iteration)
+        except RuntimeError:
+            # The state when the generation gives up is also a realistic one.
+            pass
+
+        start = time.perf_counter()
+        strategy_obj.get_coherent_cases(index_to_player)
+        coherent_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        splits = list(strategy._multiple_combination(indices, list(numbers)))
+        combination_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for villager_indices, wolf_indices, lunatic_indices in splits:
+            strategy_obj.is_result_coherent(index_to_player, villager_indices,
+                                            wolf_indices, lunatic_indices)
+        check_latencies.append((time.perf_counter() - start) / len(splits))
+
+    return {"get_coherent_cases": _summarize(coherent_latencies),
+            "is_result_coherent": _summarize(check_latencies),
+            "_multiple_combination": _summarize(combination_latencies)}
+
+
+def run_benchmarks(grid=DEFAULT_GRID, modes=None, repeat=20, max_iteration=300):
+    """ Run all the benchmarks.
+
+    :param grid: ``list`` of ``(villager_number, wolf_number, lunatic_number)``.
+    :param modes: ``list`` of strategy modes. If ``None``, the default strategy and
+                  all the modes of :func:`strategy.get_strategy_map` are used.
+    :param repeat: the number of seeds, ``0, 1, ..., repeat - 1``.
+    :return: ``dict``, which is serializable into JSON.
+    """
+    if modes is None:
+        modes = [None] + sorted(strategy.get_strategy_map().keys())
+    seeds = list(range(repeat))
+    results = dict()
+    for mode in modes:
+        for numbers in grid:
+            key = "{0}/{1}-{2}-{3}".format(mode or "default", *numbers)
+            row = {"generate_problem": bench_generate_problem(mode, numbers,
+                                                              seeds, max_iteration)}
+            row.update(bench_coherence(mode, numbers, seeds, max_iteration))
+            results[key] = row
+
+    meta = {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "max_iteration": max_iteration}
+    return {"meta": meta, "results": results}
+
+
+def compare_with_baseline(report, baseline, tolerance=0.5, statistic="p50"):
+    """ Compare the latencies with the baseline.
+
+    :param tolerance: the allowed ratio of slowdown.
+    :return: ``list`` of regressions, ``(key, phase, baseline_value, current_value)``.
+    """
+    regressions = list()
+    for key, row in report["results"].items():
+        if key not in baseline["results"]:
+            continue
+        for phase, summary in row.items():
+            base_summary = baseline["results"][key].get(phase)
+            if not base_summary:
+                continue
+            current = summary.get(statistic)
+            previous = base_summary.get(statistic)
+            if current is None or previous is None:
+                continue
+            if current > previous * (1 + tolerance):
+                regressions.append((key, phase, previous, current))
+    return regressions
+
+
+def create_parser():
+    """ Create argparser.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of Werewolves' Puzzle Generator.")
+    parser.add_argument('-repeat', type=int, default=20,
+                        help="the number of fixed seeds per configuration")
+    parser.add_argument('-max_iteration', type=int, default=300,
+                        help="the maximum iterations for generator")
+    parser.add_argument('-output', type=str, default=None,
+                        help="the path of the JSON results")
+    parser.add_argument('-baseline', type=str, default=None,
+                        help="the path of the baseline JSON results to compare with")
+    parser.add_argument('-tolerance', type=float, default=0.5,
+                        help="the allowed ratio of slowdown against the baseline")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = create_parser()
+    args = parser.parse_args()
+
+    report = run_benchmarks(repeat=args.repeat, max_iteration=args.max_iteration)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for key, phase, previous, current in regressions:
+            print("Regression:", key, phase,
+                  "{0:.6f}s -> {1:.6f}s".format(previous, current), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
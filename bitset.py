@@ -0,0 +1,181 @@
+""" Inverted index of the assignments of roles, as big-integer bitsets.
+
+The ``r``-th bit of a bitset is about the assignment of rank ``r``
+in :func:`coherence.assignment_table`.
+For every player, the index keeps the bitset of the assignments
+where the player is a villager, and that where the player is a wolf.
+Then, a claim is a bitset of the assignments which do not contradict it:
+
+* "A says B is white": A is not a villager, or B is not a wolf.
+* "A says B is black": A is not a villager, or B is a wolf.
+
+The coherent assignments are the AND of the bitsets of all the claims,
+so adding or deleting a claim is a few big-integer operations over the whole space.
+"""
+from collections import OrderedDict
+from itertools import islice
+
+from result import WHITE_CODE, BLACK_CODE
+from coherence import assignment_table, mask_to_indices, popcount
+
+ROLE_BITSETS_CACHE_SIZE = 8
+
+_role_bitsets = OrderedDict()
+
+
+def iter_ranks(bitset):
+    """ Yield the positions of the set bits in the ascending order.
+    """
+    offset = 0
+    while bitset:
+        # The bitset is shifted, so that every step is cheap even for a long bitset.
+        low = (bitset & -bitset).bit_length() - 1
+        offset += low
+        yield offset
+        bitset >>= low + 1
+        offset += 1
+
+
+class RoleBitsets(object):
+    """ The bitsets of the assignments for every player and role.
+
+    :param numbers: ``(villager_number, wolf_number, lunatic_number)``.
+    """
+
+    def __init__(self, villager_number, wolf_number, lunatic_number):
+        self.numbers = (villager_number, wolf_number, lunatic_number)
+        self.table = assignment_table(villager_number, wolf_number, lunatic_number)
+        total = sum(self.numbers)
+        length = len(self.table) // 8 + 1
+        villager_bytes = [bytearray(length) for _ in range(total)]
+        wolf_bytes = [bytearray(length) for _ in range(total)]
+        for rank, (villager_mask, wolf_mask) in enumerate(self.table):
+            position, bit = rank >> 3, 1 << (rank & 7)
+            for index in mask_to_indices(villager_mask):
+                villager_bytes[index][position] |= bit
+            for index in mask_to_indices(wolf_mask):
+                wolf_bytes[index][position] |= bit
+
+        self.all_bits = (1 << len(self.table)) - 1
+        self.villager_bits = [int.from_bytes(row, "little") for row in villager_bytes]
+        self.wolf_bits = [int.from_bytes(row, "little") for row in wolf_bytes]
+
+    def __reduce__(self):
+        # Pickled by the numbers of roles, and rebuilt from the cache of the receiver.
+        return role_bitsets, self.numbers
+
+    def claim_bits(self, from_index, to_index, code):
+        """ Return the bitset of the assignments which do not contradict the claim.
+        """
+        villager = self.villager_bits[from_index]
+        if code == WHITE_CODE:
+            return self.all_bits & ~(villager & self.wolf_bits[to_index])
+        if code == BLACK_CODE:
+            return self.all_bits & ~(villager & ~self.wolf_bits[to_index])
+        raise ValueError("Invalid code", code)
+
+
+def role_bitsets(villager_number, wolf_number, lunatic_number):
+    """ Return the cached :class:`RoleBitsets` of the numbers of roles.
+    """
+    key = (villager_number, wolf_number, lunatic_number)
+    bitsets = _role_bitsets.get(key)
+    if bitsets is None:
+        bitsets = RoleBitsets(*key)
+        _role_bitsets[key] = bitsets
+        while len(_role_bitsets) > ROLE_BITSETS_CACHE_SIZE:
+            _role_bitsets.popitem(last=False)
+    else:
+        _role_bitsets.move_to_end(key)
+    return bitsets
+
+
+class BitsetCandidates(object):
+    """ Coherent cases as the AND of the bitsets of claims.
+    This has the interface of the stores of :func:`strategy.Strategy.create_candidate_store`.
+
+    Every rejected assignment is kept in the bucket of exactly one claim which it violates.
+    Hence, at adding a claim, only the current candidates are checked, and
+    at deleting a claim, only the assignments in its bucket are rechecked
+    against the remaining claims, and moved to the bucket of another claim or restored.
+    """
+
+    def __init__(self, total, villager_number, wolf_number, lunatic_number):
+        self.total = total
+        self.numbers = (villager_number, wolf_number, lunatic_number)
+        self.bitsets = role_bitsets(villager_number, wolf_number, lunatic_number)
+        self.claims = dict()
+        # The bitsets of the assignments which contradict each claim.
+        self.reject_bits = dict()
+        # The buckets of the rejected assignments.
+        self.blocked_bits = dict()
+        self.coherent_bits = self.bitsets.all_bits
+
+    def add_claim(self, from_index, to_index, code):
+        """ Add the claim, and reject the candidates which contradict it.
+        """
+        key = (from_index, to_index)
+        if key in self.claims:
+            self.delete_claim(from_index, to_index)
+        reject_bits = self.bitsets.all_bits ^ self.bitsets.claim_bits(from_index, to_index, code)
+        self.claims[key] = code
+        self.reject_bits[key] = reject_bits
+        self.blocked_bits[key] = self.coherent_bits & reject_bits
+        self.coherent_bits ^= self.blocked_bits[key]
+
+    def delete_claim(self, from_index, to_index):
+        """ Delete the claim, and restore the assignments which only it has rejected.
+        """
+        key = (from_index, to_index)
+        del self.claims[key]
+        del self.reject_bits[key]
+        restored_bits = self.blocked_bits.pop(key)
+        for other_key, reject_bits in self.reject_bits.items():
+            if not restored_bits:
+                break
+            blocked_bits = restored_bits & reject_bits
+            if blocked_bits:
+                self.blocked_bits[other_key] |= blocked_bits
+                restored_bits ^= blocked_bits
+        self.coherent_bits |= restored_bits
+
+    def sync(self, index_to_player):
+        """ Apply the differences between the stored claims and ``index_to_player``.
+        """
+        current = dict()
+        for from_index, player in index_to_player.items():
+            for to_index, code in player.result.iter_codes():
+                if from_index != to_index:
+                    current[(from_index, to_index)] = code
+
+        for key, code in list(self.claims.items()):
+            if current.get(key) != code:
+                self.delete_claim(*key)
+        for key, code in current.items():
+            if key not in self.claims:
+                self.add_claim(key[0], key[1], code)
+
+    def count(self, limit=None):
+        """ Return the number of coherent cases, which is at most ``limit``.
+        """
+        number = popcount(self.coherent_bits)
+        if limit is None:
+            return number
+        return min(number, limit)
+
+    def iter_assignments(self):
+        """ Yield the coherent assignments as ``(villager_mask, wolf_mask)``.
+        """
+        table = self.bitsets.table
+        for rank in iter_ranks(self.coherent_bits):
+            yield table[rank]
+
+    def iter_coherent_cases(self):
+        for _, wolf_mask in self.iter_assignments():
+            yield {"wolf_indices": mask_to_indices(wolf_mask)}
+
+    def get_coherent_cases(self, limit=None):
+        return list(islice(self.iter_coherent_cases(), limit))
+
+    def sample_assignments(self, limit):
+        return list(islice(self.iter_assignments(), limit))
@@ -0,0 +1,173 @@
+""" Canonical form of the claims under the permutation of players.
+
+Two puzzles which differ only by the permutation of players
+have the same canonical form, hence the same hash.
+The canonical labelling is computed by the colour refinement of the claim graph
+and the individualisation of players, with the pruning of interchangeable players.
+"""
+import hashlib
+
+
+def claim_codes(index_to_player):
+    """ Return the matrix of claims, whose element is the code of result.
+    The implicit claims about oneself are excluded.
+    """
+    total = len(index_to_player)
+    codes = [bytearray(total) for _ in range(total)]
+    for from_index, player in index_to_player.items():
+        for to_index, code in player.result.iter_codes():
+            if from_index != to_index:
+                codes[from_index][to_index] = code
+    return codes
+
+
+def canonical_order(codes):
+    """ Return the canonical order of players, and the encoding of claims in that order.
+
+    :param codes: the matrix of :func:`claim_codes`.
+    :return: ``(order, encoding)``, where ``order[k]`` is the original index of
+             the ``k``-th player in the canonical labelling.
+    """
+    total = len(codes)
+    # The claims are sparse, so the refinement walks the lists of claims instead of the matrix.
+    edges = _claim_edges(codes)
+    colors = _refine(edges, [0] * total)
+    best = [None, None]
+
+    def _search(colors):
+        cell = _first_non_singleton_cell(colors)
+        if cell is None:
+            order = sorted(range(total), key=lambda index: colors[index])
+            encoding = _encode(edges, colors)
+            if best[1] is None or encoding < best[1]:
+                best[0], best[1] = order, encoding
+            return
+        representatives = list()
+        for index in cell:
+            if not any(_is_twin(codes, index, other) for other in representatives):
+                representatives.append(index)
+        for index in representatives:
+            individualised = [2 * color + (1 if color == colors[index] and other != index else 0)
+                              for other, color in enumerate(colors)]
+            _search(_refine(edges, individualised))
+
+    _search(colors)
+    return best[0], best[1]
+
+
+def canonical_key(index_to_player, villager_number, wolf_number, lunatic_number):
+    """ Return ``bytes`` identifying the puzzle up to the permutation of players.
+    """
+    _, encoding = canonical_order(claim_codes(index_to_player))
+    return bytes([villager_number, wolf_number, lunatic_number]) + encoding
+
+
+def canonical_hash(puzzle_generator):
+    """ Return the hash of :func:`canonical_key` of the generated puzzle, as ``str``.
+    """
+    key = canonical_key(puzzle_generator.index_to_player,
+                        puzzle_generator.villager_number,
+                        puzzle_generator.wolf_number,
+                        puzzle_generator.lunatic_number)
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+class DedupeIndex(object):
+    """ Index of canonical hashes, to eliminate the isomorphic puzzles.
+    """
+
+    def __init__(self, hashes=()):
+        self.hashes = set(hashes)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, puzzle_hash):
+        return puzzle_hash in self.hashes
+
+    def add(self, puzzle_hash):
+        """ Add the hash.
+
+        :return: ``True``, if the hash is new. Otherwise, ``False``.
+        """
+        if puzzle_hash in self.hashes:
+            return False
+        self.hashes.add(puzzle_hash)
+        return True
+
+
+def _claim_edges(codes):
+    """ Return the lists of claims, ``(out_edges, in_edges)``.
+    ``out_edges[i]`` is the list of ``(j, code)`` claimed by ``i``, and
+    ``in_edges[j]`` is the list of ``(i, code)`` claimed about ``j``.
+    """
+    total = len(codes)
+    out_edges = [list() for _ in range(total)]
+    in_edges = [list() for _ in range(total)]
+    for from_index in range(total):
+        for to_index, code in enumerate(codes[from_index]):
+            if code:
+                out_edges[from_index].append((to_index, code))
+                in_edges[to_index].append((from_index, code))
+    return out_edges, in_edges
+
+
+def _encode(edges, colors):
+    """ Return the matrix of claims in the order of the discrete colours, as ``bytes``.
+    """
+    out_edges, _ = edges
+    total = len(colors)
+    encoding = bytearray(total * total)
+    for from_index, claims in enumerate(out_edges):
+        row = colors[from_index] * total
+        for to_index, code in claims:
+            encoding[row + colors[to_index]] = code
+    return bytes(encoding)
+
+
+def _refine(edges, colors):
+    """ Refine the colours of players by their claims, until the partition is stable.
+    The colours are ranks of the signatures, so they do not depend on the labelling.
+    """
+    out_edges, in_edges = edges
+    total = len(colors)
+    class_number = len(set(colors))
+    while True:
+        signatures = list()
+        for index in range(total):
+            out_claims = sorted((code, colors[other]) for other, code in out_edges[index])
+            in_claims = sorted((code, colors[other]) for other, code in in_edges[index])
+            signatures.append((colors[index], tuple(out_claims), tuple(in_claims)))
+        ranking = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+        colors = [ranking[signature] for signature in signatures]
+        if len(ranking) == class_number:
+            return colors
+        class_number = len(ranking)
+
+
+def _first_non_singleton_cell(colors):
+    """ Return the players of the non-singleton cell with the smallest colour, or ``None``.
+    """
+    color_to_indices = dict()
+    for index, color in enumerate(colors):
+        color_to_indices.setdefault(color, list()).append(index)
+    cells = [indices for color, indices in sorted(color_to_indices.items())
+             if len(indices) > 1]
+    if not cells:
+        return None
+    return cells[0]
+
+
+def _is_twin(codes, first, second):
+    """ Return whether swapping two players leaves the claims unchanged.
+    """
+    if codes[first][second] != codes[second][first]:
+        return False
+    for other in range(len(codes)):
+        if other == first or other == second:
+            continue
+        if codes[first][other] != codes[second][other]:
+            return False
+        if codes[other][first] != codes[other][second]:
+            return False
+    return True
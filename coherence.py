@@ -0,0 +1,332 @@
+""" Bitmask-based coherence engine.
+
+Each player's claims are stored as two integer bitmasks,
+(claimed-white, claimed-black), and each candidate assignment of roles
+is stored as a villager mask and a wolf mask.
+Then, the coherence check becomes a few AND/compare operations per villager.
+"""
+from array import array
+from collections import OrderedDict
+from itertools import combinations
+from math import comb
+from multiprocessing import shared_memory
+
+
+def indices_to_mask(indices):
+    """ Convert the indices of players to the bitmask.
+    """
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+
+if hasattr(int, "bit_count"):
+    def popcount(mask):
+        """ Return the number of the set bits.
+        """
+        return mask.bit_count()
+else:
+    # ``int.bit_count`` is available since Python 3.10.
+    def popcount(mask):
+        """ Return the number of the set bits.
+        """
+        return bin(mask).count("1")
+
+
+def mask_to_indices(mask):
+    """ Convert the bitmask to the sorted indices of players.
+    """
+    indices = list()
+    index = 0
+    while mask:
+        if mask & 1:
+            indices.append(index)
+        mask >>= 1
+        index += 1
+    return indices
+
+
+class ClaimMasks(object):
+    """ Claims of all the players, represented as bitmasks.
+
+    :param white_masks: ``list``, the i-th element is the mask of players
+                        whom the i-th player claims to be white.
+    :param black_masks: ``list``, the i-th element is the mask of players
+                        whom the i-th player claims to be black.
+    """
+
+    def __init__(self, white_masks, black_masks):
+        self.white_masks = list(white_masks)
+        self.black_masks = list(black_masks)
+        # Only the players who claim something about others can contradict.
+        self.claimers = [(index, self.white_masks[index], self.black_masks[index])
+                         for index in range(len(self.white_masks))
+                         if (self.white_masks[index] | self.black_masks[index]) & ~(1 << index)]
+
+    @classmethod
+    def from_players(cls, index_to_player):
+        """ Create the masks from ``index_to_player``.
+        """
+        total = len(index_to_player)
+        white_masks = [0] * total
+        black_masks = [0] * total
+        for index, player in index_to_player.items():
+            white_masks[index], black_masks[index] = player.result.masks()
+        return cls(white_masks, black_masks)
+
+    def is_coherent(self, villager_mask, wolf_mask):
+        """ Check whether the assignment is coherent or not.
+
+        Only villagers' claims are checked, since wolves and lunatics may lie.
+        A villager's claim is right if and only if the players claimed white are not
+        wolves and the players claimed black are wolves.
+
+        :return: ``True``, if the assignment is coherent. Otherwise, ``False``.
+        """
+        for index, white, black in self.claimers:
+            if (villager_mask >> index) & 1:
+                if white & wolf_mask or black & ~wolf_mask:
+                    return False
+        return True
+
+
+def assignment_count(villager_number, wolf_number, lunatic_number):
+    """ Return the number of the assignments of roles.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    return comb(total, villager_number) * comb(total - villager_number, wolf_number)
+
+
+def iter_assignment_masks(total, villager_number, wolf_number, lunatic_number):
+    """ Yield all the assignments of roles as ``(villager_mask, wolf_mask)``.
+
+    The order is the same as that of :func:`strategy._multiple_combination`.
+    Lunatics are the remaining players of each assignment.
+    """
+    assert villager_number + wolf_number + lunatic_number == total
+    all_bits = [1 << index for index in range(total)]
+    for villager_bits in combinations(all_bits, villager_number):
+        villager_mask = sum(villager_bits)
+        remain_bits = [bit for bit in all_bits if not bit & villager_mask]
+        for wolf_bits in combinations(remain_bits, wolf_number):
+            yield villager_mask, sum(wolf_bits)
+
+
+ASSIGNMENT_TABLE_CACHE_SIZE = 8
+
+# The masks of :class:`AssignmentTable` are 64-bit.
+TABLE_PLAYER_LIMIT = 64
+
+# The tables depend only on the numbers of roles, so they are shared by all the strategies.
+_assignment_tables = OrderedDict()
+
+
+class AssignmentTable(object):
+    """ All the assignments of roles, packed as 64-bit masks,
+    ``villager_mask, wolf_mask, villager_mask, wolf_mask, ...``.
+    The order is the same as that of :func:`iter_assignment_masks`.
+
+    :param numbers: ``(villager_number, wolf_number, lunatic_number)``.
+    :param masks: ``array("Q")``, or ``memoryview`` of a shared memory segment.
+    """
+
+    def __init__(self, numbers, masks, shared=None):
+        self.numbers = tuple(numbers)
+        self.masks = masks
+        # The segment must be kept open while ``masks`` refers to it.
+        self._shared = shared
+
+    @classmethod
+    def build(cls, villager_number, wolf_number, lunatic_number):
+        """ Enumerate all the assignments.
+        """
+        total = villager_number + wolf_number + lunatic_number
+        if total > TABLE_PLAYER_LIMIT:
+            raise ValueError("The table is available only up to 64 players.", total)
+        masks = array("Q")
+        for villager_mask, wolf_mask in iter_assignment_masks(total, villager_number,
+                                                              wolf_number, lunatic_number):
+            masks.append(villager_mask)
+            masks.append(wolf_mask)
+        return cls((villager_number, wolf_number, lunatic_number), masks)
+
+    @classmethod
+    def attach(cls, name, numbers):
+        """ Attach to the shared memory segment created by :func:`share`.
+        """
+        shared = shared_memory.SharedMemory(name=name)
+        size = 2 * assignment_count(*numbers)
+        return cls(numbers, shared.buf.cast("Q")[:size], shared)
+
+    def share(self):
+        """ Copy the table into a new shared memory segment.
+
+        :return: ``SharedMemory``. The caller must ``close`` and ``unlink`` it.
+        """
+        data = memoryview(self.masks).cast("B")
+        shared = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shared.buf[:len(data)] = data
+        return shared
+
+    def __reduce__(self):
+        # Pickled by the numbers of roles, and rebuilt from the cache of the receiver.
+        return assignment_table, self.numbers
+
+    def __len__(self):
+        return len(self.masks) // 2
+
+    def __getitem__(self, rank):
+        return self.masks[2 * rank], self.masks[2 * rank + 1]
+
+    def __iter__(self):
+        masks = iter(self.masks)
+        return zip(masks, masks)
+
+
+def assignment_table(villager_number, wolf_number, lunatic_number):
+    """ Return the cached :class:`AssignmentTable` of the numbers of roles.
+    At most ``ASSIGNMENT_TABLE_CACHE_SIZE`` tables are kept, and the least recently used
+    table is evicted.
+    """
+    key = (villager_number, wolf_number, lunatic_number)
+    table = _assignment_tables.get(key)
+    if table is None:
+        table = AssignmentTable.build(*key)
+        install_assignment_table(table)
+    else:
+        _assignment_tables.move_to_end(key)
+    return table
+
+
+def install_assignment_table(table):
+    """ Put the table into the cache, e.g. a table attached to the shared memory.
+    """
+    _assignment_tables[table.numbers] = table
+    _assignment_tables.move_to_end(table.numbers)
+    while len(_assignment_tables) > ASSIGNMENT_TABLE_CACHE_SIZE:
+        _assignment_tables.popitem(last=False)
+
+
+def iter_wolf_sets(claim_masks, villager_number, wolf_number, lunatic_number):
+    """ Yield the wolf sets which have at least one coherent completion,
+    as ``(wolf_mask, forced_lunatic_mask)``.
+
+    Only villagers' claims are checked, and lunatics and villagers are indistinguishable
+    to any claim. Hence, for each wolf set, the non-wolves whose claims are inconsistent
+    must be lunatics, and the other non-wolves are free.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    all_bits = [1 << index for index in range(total)]
+    claimers = claim_masks.claimers
+    for wolf_bits in combinations(all_bits, wolf_number):
+        wolf_mask = sum(wolf_bits)
+        forced_lunatic_mask = 0
+        forced_number = 0
+        for index, white, black in claimers:
+            if (wolf_mask >> index) & 1:
+                continue
+            if white & wolf_mask or black & ~wolf_mask:
+                forced_lunatic_mask |= 1 << index
+                forced_number += 1
+                if forced_number > lunatic_number:
+                    break
+        else:
+            yield wolf_mask, forced_lunatic_mask
+
+
+def completion_count(forced_lunatic_mask, villager_number, lunatic_number):
+    """ Return the number of the coherent completions of a wolf set.
+    """
+    forced_number = bin(forced_lunatic_mask).count("1")
+    return comb(villager_number + lunatic_number - forced_number,
+                lunatic_number - forced_number)
+
+
+def count_coherent_assignments(claim_masks, villager_number, wolf_number, lunatic_number,
+                               limit=None):
+    """ Count the coherent assignments, enumerating the wolf sets only.
+    The completions of each wolf set are counted in the closed form. 
+
+    :param limit: the upper bound of counting. If ``None``, all the cases are counted.
+    """
+    number = 0
+    for _, forced_lunatic_mask in iter_wolf_sets(claim_masks, villager_number,
+                                                 wolf_number, lunatic_number):
+        number += completion_count(forced_lunatic_mask, villager_number, lunatic_number)
+        if limit is not None and number >= limit:
+            return limit
+    return number
+
+
+def iter_coherent_assignments(claim_masks, villager_number, wolf_number, lunatic_number):
+    """ Yield the coherent assignments as ``(villager_mask, wolf_mask)``, 
+    enumerating the wolf sets first and then their completions. 
+    """
+    total = villager_number + wolf_number + lunatic_number
+    all_mask = (1 << total) - 1
+    for wolf_mask, forced_lunatic_mask in iter_wolf_sets(claim_masks, villager_number,
+                                                         wolf_number, lunatic_number):
+        free_mask = all_mask & ~wolf_mask & ~forced_lunatic_mask
+        free_bits = [1 << index for index in mask_to_indices(free_mask)]
+        for villager_bits in combinations(free_bits, villager_number):
+            yield sum(villager_bits), wolf_mask
+
+
+def find_swapped_assignment(claim_masks, villager_mask, wolf_mask):
+    """ Find another coherent assignment, where the roles of two players are swapped.
+    If it is found, the coherent assignment is not unique, without any search.
+
+    The given assignment must be coherent, so only the claims affected by the swap are checked:
+
+    * a villager and a lunatic: the wolves are kept, so only the new villager is checked.
+    * a wolf and a lunatic: the villagers are kept, so only the claims about the two are checked.
+    * a villager and a wolf: the other villagers' claims about the two and the new villager are checked.
+
+    :return: ``(villager_mask, wolf_mask)``, or ``None`` if no such assignment is coherent.
+    """
+    total = len(claim_masks.white_masks)
+    lunatic_mask = ((1 << total) - 1) & ~villager_mask & ~wolf_mask
+    claims = {index: (white, black) for index, white, black in claim_masks.claimers}
+
+    def _is_right(index, wolves):
+        white, black = claims.get(index, (0, 0))
+        return not (white & wolves or black & ~wolves)
+
+    if villager_mask:
+        for index in mask_to_indices(lunatic_mask):
+            if _is_right(index, wolf_mask):
+                villager_bit = villager_mask & -villager_mask
+                return villager_mask ^ villager_bit ^ (1 << index), wolf_mask
+
+    villager_claims = [(index, white, black) for index, white, black in claim_masks.claimers
+                       if (villager_mask >> index) & 1]
+    white_union = 0
+    black_union = 0
+    for _, white, black in villager_claims:
+        white_union |= white
+        black_union |= black
+    wolves = wolf_mask & ~black_union
+    lunatics = lunatic_mask & ~white_union
+    if wolves and lunatics:
+        return villager_mask, wolf_mask ^ (wolves & -wolves) ^ (lunatics & -lunatics)
+
+    for villager_index in mask_to_indices(villager_mask):
+        villager_bit = 1 << villager_index
+        other_white_union = white_union
+        other_black_union = black_union
+        if villager_index in claims:
+            other_white_union = 0
+            other_black_union = 0
+            for index, white, black in villager_claims:
+                if index != villager_index:
+                    other_white_union |= white
+                    other_black_union |= black
+        if villager_bit & other_white_union:
+            continue
+        for wolf_index in mask_to_indices(wolf_mask & ~other_black_union):
+            swapped_wolf_mask = wolf_mask ^ (1 << wolf_index) ^ villager_bit
+            if _is_right(wolf_index, swapped_wolf_mask):
+                return villager_mask ^ villager_bit ^ (1 << wolf_index), swapped_wolf_mask
+    return None
+
@@ -0,0 +1,217 @@
+""" Binary corpus of puzzles, which is read by memory mapping.
+
+All the puzzles of a corpus have the same numbers of roles, so that every record
+has the same size, and the ``k``-th puzzle is at ``HEADER_SIZE + k * record_size``.
+Hence, a puzzle is reached in O(1) without reading the others,
+and the number of puzzles is derived from the size of the file,
+which allows a corpus to be written as a stream.
+
+Header (``HEADER_SIZE`` bytes, little endian):
+
+* magic ``b"WWPZ"``, version (``uint16``),
+* the numbers of villagers, wolves and lunatics (``uint16`` each),
+* the strategy mode (UTF-8, padded with NUL, empty for ``None``).
+
+Record, where every mask is ``(the number of players + 7) // 8`` bytes in little endian:
+
+* the white masks of all the players, then the black masks of all the players,
+* the mask of the wolves of the answer.
+
+```
+python puzzle_generator.py -count 1000 -format corpus > puzzles.wwpz
+```
+"""
+import mmap
+import os
+import struct
+
+from result import WHITE_CODE, BLACK_CODE
+from coherence import indices_to_mask, mask_to_indices
+from player import ClaimMatrix
+
+MAGIC = b"WWPZ"
+VERSION = 1
+
+# The number of bytes of the strategy mode in the header.
+MODE_SIZE = 52
+
+_HEADER_STRUCT = struct.Struct("<4sHHHH{0}s".format(MODE_SIZE))
+HEADER_SIZE = _HEADER_STRUCT.size
+
+
+def mask_width(total):
+    """ Return the number of bytes of a mask of ``total`` players.
+    """
+    return (total + 7) // 8
+
+
+def record_size(total):
+    """ Return the number of bytes of a record of ``total`` players.
+    """
+    return (2 * total + 1) * mask_width(total)
+
+
+def pack_header(villager_number, wolf_number, lunatic_number, strategy_mode=None):
+    """ Return the header as ``bytes``.
+    """
+    mode = b"" if strategy_mode is None else strategy_mode.encode("utf-8")
+    if len(mode) > MODE_SIZE:
+        raise ValueError("The strategy mode is too long.", strategy_mode)
+    return _HEADER_STRUCT.pack(MAGIC, VERSION, villager_number, wolf_number, lunatic_number, mode)
+
+
+def unpack_header(data):
+    """ Return ``(villager_number, wolf_number, lunatic_number, strategy_mode)`` of the header.
+    """
+    if len(data) < HEADER_SIZE:
+        raise ValueError("The corpus is too short.")
+    magic, version, villager_number, wolf_number, lunatic_number, mode = \
+        _HEADER_STRUCT.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Invalid magic.", magic)
+    if version != VERSION:
+        raise ValueError("Unsupported version.", version)
+    mode = bytes(mode).rstrip(b"\0").decode("utf-8")
+    return villager_number, wolf_number, lunatic_number, (mode or None)
+
+
+def pack_record(claim_matrix, wolf_indices):
+    """ Return the record of the puzzle as ``bytes``.
+
+    :param claim_matrix: :class:`player.ClaimMatrix`.
+    :param wolf_indices: the indices of the wolves of the answer.
+    """
+    total = len(claim_matrix)
+    width = mask_width(total)
+    white_masks = list()
+    black_masks = list()
+    for row in claim_matrix.rows:
+        white_mask = 0
+        black_mask = 0
+        for index, code in enumerate(row):
+            if code == WHITE_CODE:
+                white_mask |= 1 << index
+            elif code == BLACK_CODE:
+                black_mask |= 1 << index
+        white_masks.append(white_mask)
+        black_masks.append(black_mask)
+    masks = white_masks + black_masks + [indices_to_mask(wolf_indices)]
+    return b"".join(mask.to_bytes(width, "little") for mask in masks)
+
+
+def unpack_record(data, total):
+    """ Return ``(claim_matrix, wolf_indices)`` of the record.
+    """
+    width = mask_width(total)
+    masks = [int.from_bytes(data[offset:offset + width], "little")
+             for offset in range(0, (2 * total + 1) * width, width)]
+    claim_matrix = ClaimMatrix(total)
+    for index, row in enumerate(claim_matrix.rows):
+        for to_index in mask_to_indices(masks[index]):
+            row[to_index] = WHITE_CODE
+        for to_index in mask_to_indices(masks[total + index]):
+            row[to_index] = BLACK_CODE
+    return claim_matrix, mask_to_indices(masks[2 * total])
+
+
+class CorpusWriter(object):
+    """ Writer of puzzles into a binary stream.
+    The header is written at the first puzzle.
+
+    :param stream: the binary stream, such as ``open(path, "wb")``.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.header = None
+        self.number = 0
+
+    def write(self, puzzle_generator):
+        """ Write the generated puzzle.
+
+        :raise ValueError: if the numbers of roles or the strategy mode differ
+                           from those of the first puzzle.
+        """
+        header = pack_header(puzzle_generator.villager_number, puzzle_generator.wolf_number,
+                             puzzle_generator.lunatic_number, puzzle_generator.strategy_mode)
+        if self.header is None:
+            self.header = header
+            self.stream.write(header)
+        elif header != self.header:
+            raise ValueError("All the puzzles of a corpus must have the same configuration.")
+        self.stream.write(pack_record(puzzle_generator.claim_matrix,
+                                      puzzle_generator.answer["wolf_indices"]))
+        self.number += 1
+
+
+class Corpus(object):
+    """ Reader of a binary corpus, which maps the file into the memory.
+    Only the pages of the accessed puzzles are read.
+
+    :param path: the path of the corpus.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as fp:
+            # An empty file cannot be mapped, and a short one has no header.
+            if os.fstat(fp.fileno()).st_size < HEADER_SIZE:
+                raise ValueError("The corpus is too short.", path)
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            (self.villager_number, self.wolf_number,
+             self.lunatic_number, self.strategy_mode) = unpack_header(self._view)
+        except ValueError:
+            self.close()
+            raise
+        self.total = self.villager_number + self.wolf_number + self.lunatic_number
+        self.record_size = record_size(self.total)
+        # A partially written record at the end is ignored.
+        self._length = (len(self._mmap) - HEADER_SIZE) // self.record_size
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        """ Return the record of the ``index``-th puzzle as ``memoryview``, without copying.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        offset = HEADER_SIZE + index * self.record_size
+        return self._view[offset:offset + self.record_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ Close the mapping. The records returned by ``[]`` must be released before.
+        """
+        self._view.release()
+        self._mmap.close()
+
+    def puzzle(self, index, lang="en"):
+        """ Return the ``index``-th puzzle as :class:`puzzle_generator.PuzzleGenereator`,
+        whose :func:`display_problems` and :func:`display_answers` are available.
+        """
+        # Imported here, since ``puzzle_generator`` uses this module via ``export``.
+        from puzzle_generator import PuzzleGenereator
+        record = self[index]
+        try:
+            claim_matrix, wolf_indices = unpack_record(record, self.total)
+        finally:
+            record.release()
+        return PuzzleGenereator.restore(claim_matrix, self.villager_number, self.wolf_number,
+                                        self.lunatic_number, wolf_indices,
+                                        lang=lang, strategy_mode=self.strategy_mode)
+
+    def render(self, index, lang="en"):
+        """ Return the text of the ``index``-th puzzle, in the markdown format.
+        """
+        puzzle_generator = self.puzzle(index, lang)
+        return "\n".join([puzzle_generator.display_problems(),
+                          puzzle_generator.display_answers()]) + "\n"
@@ -0,0 +1,115 @@
+""" Formatters of generated puzzles.
+
+Each formatter converts one :class:`puzzle_generator.PuzzleGenereator` into text,
+so that puzzles can be written one by one as soon as they are generated.
+"""
+import json
+
+import corpus
+
+
+def get_formatter_map():
+    """ Return the defined output formats.
+    """
+    _format_dict = {"markdown": MarkdownFormatter,
+                    "jsonl": JsonLinesFormatter,
+                    "corpus": CorpusFormatter}
+    return _format_dict
+
+
+def choose_formatter(format_key):
+    format_dict = get_formatter_map()
+    if format_key not in format_dict:
+        raise ValueError("The corresponding format is not existent.", format_key)
+    return format_dict[format_key]
+
+
+def to_record(puzzle_generator):
+    """ Convert the generated puzzle to ``dict``, which is serializable into JSON.
+
+    ``claims`` is the list of ``[from_index, to_index, result_id]``,
+    excluding the implicit claims about oneself.
+    """
+    claims = list()
+    for from_index in sorted(puzzle_generator.index_to_player):
+        player = puzzle_generator.index_to_player[from_index]
+        for to_index in sorted(player.result):
+            if to_index != from_index:
+                claims.append([from_index, to_index, player.result[to_index]])
+
+    record = dict()
+    record["villager_number"] = puzzle_generator.villager_number
+    record["wolf_number"] = puzzle_generator.wolf_number
+    record["lunatic_number"] = puzzle_generator.lunatic_number
+    record["strategy_mode"] = puzzle_generator.strategy_mode
+    record["seed"] = puzzle_generator.seed
+    record["claims"] = claims
+    record["wolf_indices"] = sorted(puzzle_generator.answer["wolf_indices"])
+    return record
+
+
+class Formatter(object):
+    """ Abstract class for formatters.
+    """
+
+    def format(self, puzzle_generator):
+        """ Return the text of one puzzle, which ends with a newline.
+        The binary formats, such as :class:`CorpusFormatter`, return ``bytes`` instead,
+        and override :func:`write` to write them to the binary buffer.
+        """
+        raise SyntaxError("Please Implement.")
+
+    def write(self, puzzle_generators, stream):
+        """ Write the puzzles to ``stream`` one by one.
+
+        :param puzzle_generators: iterable of generated puzzles, such as a generator.
+        :return: ``int``, the number of written puzzles.
+        """
+        number = 0
+        for puzzle_generator in puzzle_generators:
+            stream.write(self.format(puzzle_generator))
+            stream.flush()
+            number += 1
+        return number
+
+
+class MarkdownFormatter(Formatter):
+    """ The text of :func:`display_problems` and :func:`display_answers`.
+    """
+
+    def format(self, puzzle_generator):
+        problem_text = puzzle_generator.display_problems()
+        answer_text = puzzle_generator.display_answers()
+        return "\n".join([problem_text, answer_text]) + "\n"
+
+
+class JsonLinesFormatter(Formatter):
+    """ One JSON record of :func:`to_record` per line.
+    """
+
+    def format(self, puzzle_generator):
+        return json.dumps(to_record(puzzle_generator), ensure_ascii=False) + "\n"
+
+
+class CorpusFormatter(Formatter):
+    """ The binary records of :mod:`corpus`.
+    They are written to the underlying binary buffer of a text stream, such as ``sys.stdout``.
+    """
+
+    def format(self, puzzle_generator):
+        """ Return the corpus of the single puzzle as ``bytes``.
+        """
+        header = corpus.pack_header(puzzle_generator.villager_number,
+                                    puzzle_generator.wolf_number,
+                                    puzzle_generator.lunatic_number,
+                                    puzzle_generator.strategy_mode)
+        return header + corpus.pack_record(puzzle_generator.claim_matrix,
+                                           puzzle_generator.answer["wolf_indices"])
+
+    def write(self, puzzle_generators, stream):
+        stream = getattr(stream, "buffer", stream)
+        writer = corpus.CorpusWriter(stream)
+        for puzzle_generator in puzzle_generators:
+            writer.write(puzzle_generator)
+            stream.flush()
+        return writer.number
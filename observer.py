@@ -0,0 +1,95 @@
+""" Observers of :func:`strategy.Strategy.generate_problem`.
+
+An observer receives one :class:`IterationEvent` per iteration.
+When no observer is given, nothing is measured, so the overhead is negligible.
+"""
+import json
+from collections import namedtuple
+
+
+class IterationEvent(namedtuple("IterationEvent",
+                                ["iteration", "coherent_number", "action", "claims",
+                                 "coherence_time", "selection_time"])):
+    """ The event of one iteration.
+
+    :param iteration: the iteration number, starting from 0.
+    :param coherent_number: the number of coherent cases,
+                            counted up to :data:`strategy.UNIQUENESS_LIMIT`.
+    :param action: ``"add"``, ``"delete"``, or ``"found"``.
+    :param claims: ``list`` of the changed claims, ``(from_index, to_index, result_id)``.
+                   ``result_id`` is ``None`` for a deleted claim.
+    :param coherence_time: the seconds spent in the coherence check.
+    :param selection_time: the seconds spent in adding or deleting the claim.
+    """
+    __slots__ = ()
+
+
+class GenerationObserver(object):
+    """ Abstract class for observers.
+    """
+
+    def on_iteration(self, event):
+        """ Called at every iteration with :class:`IterationEvent`.
+        """
+        pass
+
+    def on_finish(self, succeeded):
+        """ Called when the generation ends.
+
+        :param succeeded: ``False``, if ``RuntimeError`` is raised.
+        """
+        pass
+
+
+class TraceObserver(GenerationObserver):
+    """ Observer which aggregates the counters over the generations.
+
+    ``switches`` counts the changes of the action between ``"add"`` and ``"delete"``,
+    which shows how much the generation thrashes.
+
+    :param keep_events: if ``True``, all the events are kept for :func:`dump_json`.
+    """
+    counter_keys = ["runs", "successes", "failures", "iterations", "adds", "deletes",
+                    "switches", "coherence_time", "selection_time"]
+
+    def __init__(self, keep_events=False):
+        self.keep_events = keep_events
+        self.events = list()
+        self.counters = {key: 0 for key in self.counter_keys}
+        self._previous_action = None
+
+    def on_iteration(self, event):
+        self.counters["iterations"] += 1
+        self.counters["coherence_time"] += event.coherence_time
+        self.counters["selection_time"] += event.selection_time
+        if event.action == "add":
+            self.counters["adds"] += 1
+        elif event.action == "delete":
+            self.counters["deletes"] += 1
+        if event.action in ("add", "delete"):
+            if self._previous_action not in (None, event.action):
+                self.counters["switches"] += 1
+            self._previous_action = event.action
+        if self.keep_events:
+            self.events.append(event)
+
+    def on_finish(self, succeeded):
+        self.counters["runs"] += 1
+        if succeeded:
+            self.counters["successes"] += 1
+        else:
+            self.counters["failures"] += 1
+        self._previous_action = None
+
+    def to_dict(self):
+        """ Return the counters and the kept events as ``dict``.
+        """
+        result = {"counters": dict(self.counters)}
+        if self.keep_events:
+            result["events"] = [event._asdict() for event in self.events]
+        return result
+
+    def dump_json(self, fp):
+        """ Dump :func:`to_dict` into the file object ``fp`` as JSON.
+        """
+        json.dump(self.to_dict(), fp, indent=2)
@@ -0,0 +1,32 @@
+""" Streaming over a process pool.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def iter_bounded_map(function, items, jobs, initializer=None, initargs=()):
+    """ Yield ``function(item)`` for every item in order, computed across worker processes.
+
+    The items are read lazily, and the number of items in flight is bounded by ``2 * jobs``,
+    so that the memory stays flat however many items are given.
+    If ``jobs`` is 1, the items are computed in this process without any pool.
+
+    :param function: picklable function, such as a module-level one or its ``partial``.
+    :param initializer: the initializer of every worker process.
+    """
+    if jobs == 1:
+        for item in items:
+            yield function(item)
+        return
+
+    executor = ProcessPoolExecutor(jobs, initializer=initializer, initargs=initargs)
+    try:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
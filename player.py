@@ -1,6 +1,102 @@
 """ Player Class.
 """
-from result import WhiteResult
+from collections.abc import MutableMapping
+
+from result import WhiteResult, WHITE_CODE, BLACK_CODE, UNKNOWN_CODE, id_to_code, code_to_id
+
+
+# Tables of ``bytes.translate``, from the codes of results to the binary digits.
+_WHITE_DIGITS = bytes(ord("1") if code == WHITE_CODE else ord("0") for code in range(256))
+_BLACK_DIGITS = bytes(ord("1") if code == BLACK_CODE else ord("0") for code in range(256))
+
+
+class ClaimMatrix(object):
+    """ n×n matrix of claims, whose element is the code of result. 
+    The i-th row holds the claims of the i-th player, 
+    and ``UNKNOWN_CODE`` means no claim.
+
+    :param total: the number of players.
+    """
+    __slots__ = ("rows",)
+
+    def __init__(self, total):
+        self.rows = [bytearray(total) for _ in range(total)]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def permute(self, order):
+        """ Return the new matrix, whose ``k``-th player is the ``order[k]``-th player of this.
+        """
+        permuted = ClaimMatrix(0)
+        permuted.rows = [bytearray(map(self.rows[index].__getitem__, order)) for index in order]
+        return permuted
+
+    def create_players(self):
+        """ Return ``index_to_player``, whose players are views of the rows.
+        """
+        return {index: Player(index, row) for index, row in enumerate(self.rows)}
+
+
+class ClaimRow(MutableMapping):
+    """ View of a row of :class:`ClaimMatrix` as ``dict``, 
+    which maps the index of player to the id of result. 
+
+    The codes of results are also accepted at assignment.
+    The claims are iterated in the order of the index of player, not in the order of insertion.
+    """
+    __slots__ = ("row",)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getitem__(self, index):
+        if 0 <= index < len(self.row) and self.row[index]:
+            return code_to_id(self.row[index])
+        raise KeyError(index)
+
+    def __setitem__(self, index, result):
+        code = result if isinstance(result, int) else id_to_code(result)
+        if code not in (WHITE_CODE, BLACK_CODE):
+            raise ValueError("Invalid code.", code)
+        if index >= len(self.row):
+            self.row.extend(bytes(index + 1 - len(self.row)))
+        self.row[index] = code
+
+    def __delitem__(self, index):
+        if not (0 <= index < len(self.row) and self.row[index]):
+            raise KeyError(index)
+        self.row[index] = UNKNOWN_CODE
+
+    def __contains__(self, index):
+        return 0 <= index < len(self.row) and self.row[index] != UNKNOWN_CODE
+
+    def __iter__(self):
+        row = self.row
+        return (index for index in range(len(row)) if row[index])
+
+    def __len__(self):
+        return len(self.row) - self.row.count(UNKNOWN_CODE)
+
+    def count(self, code):
+        """ Return the number of the claims of ``code``.
+        """
+        return self.row.count(code)
+
+    def iter_codes(self):
+        """ Yield ``(index, code)`` of the claims.
+        """
+        row = self.row
+        return ((index, row[index]) for index in range(len(row)) if row[index])
+
+    def masks(self):
+        """ Return ``(white_mask, black_mask)`` of the claims.
+        """
+        # The row is translated into binary digits, the first player as the lowest bit.
+        reversed_row = self.row[::-1]
+        white_mask = int(reversed_row.translate(_WHITE_DIGITS) or b"0", 2)
+        black_mask = int(reversed_row.translate(_BLACK_DIGITS) or b"0", 2)
+        return white_mask, black_mask
 
 
 class Player(object):
@@ -9,12 +105,31 @@ class Player(object):
     Claims about other players are stored in  **result**. 
     All players impliticly claim that one's own color is white. 
 
+    **result** behaves as ``dict`` from the index of player to the id of result,
+    while it is stored in a row of :class:`ClaimMatrix`.
+
+    :param row: the row of :class:`ClaimMatrix`. If ``None``, the player has its own row.
     """
+    __slots__ = ("index", "_result")
 
-    def __init__(self, index):
-        self.result = dict()
+    def __init__(self, index, row=None):
+        if row is None:
+            row = bytearray(index + 1)
+        self._result = ClaimRow(row)
         self.index = index
-        self.result[index] = WhiteResult.get_id()
+        self.result[index] = WhiteResult.get_code()
+
+    @property
+    def result(self):
+        return self._result
+
+    @result.setter
+    def result(self, claims):
+        # ``claims`` may be the view of this row itself, so that it is copied before clearing.
+        claims = dict(claims)
+        row = self._result.row
+        row[:] = bytes(len(row))
+        self._result.update(claims)
 
     @classmethod
     def get_name(cls):
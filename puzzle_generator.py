@@ -2,16 +2,41 @@
 
 """
 import argparse
-
-from result import WhiteResult, BlackResult
-from player import Player
+import multiprocessing
+import os
+import random
+import sys
+import time
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from result import WHITE_CODE, BLACK_CODE
+from player import ClaimMatrix
+from coherence import AssignmentTable, assignment_table, install_assignment_table
+from solver import RoleSolver
 import strategy
+import export
+import canonical
+from observer import TraceObserver, GenerationObserver
+from parallel import iter_bounded_map
+
+# The difference of seeds between the retries of a failed generation in batch mode.
+ATTEMPT_SEED_STRIDE = 1 << 32
+
+# The maximum mutations of a problem, which converges back to its parent.
+MUTATION_ATTEMPTS = 8
 
 
 def _index_to_alphabet(index):
     """ Convert the index to the alphabet.
+    After ``Z``, two or more letters are used, ``AA``, ``AB``, ..., ``ZZ``, ``AAA``, ...
     """
-    return chr(ord("A") + index)
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
 
 
 class PuzzleGenereator(object):
@@ -22,9 +47,18 @@ class PuzzleGenereator(object):
     :param lunatic_number: the number of lunatics.
     :param lang: language.
     :param strategy_mode: the mode of generation. 
+    :param seed: the seed of the ``random.Random`` of the generator and its strategy.
+                 If given, the generation is reproducible.
+    :param selection: the mode of selecting claims, either of ``strategy.SELECTION_MODES``.
+    :param minimize: if ``True``, the claims which are not needed for the uniqueness are removed.
     """
     def __init__(self, villager_number, wolf_number, lunatic_number,
-                 lang="en", strategy_mode=None):
+                 lang="en", strategy_mode=None, seed=None, selection="random", minimize=False):
+        # The generator owns its random state, so the global ``random`` is never reseeded.
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.strategy_mode = strategy_mode
+        self.puzzle_hash = None
         self.villager_number = villager_number
         self.wolf_number = wolf_number
         self.lunatic_number = lunatic_number
@@ -36,17 +70,109 @@ class PuzzleGenereator(object):
         self.index_to_player = self._initialize_players()
         self.answer = None
         strategy_class = strategy.choose_strategy(strategy_mode)
-        self.strategy = strategy_class(villager_number, wolf_number, lunatic_number)
-
-    def generate_problem(self, max_iteration=100):
+        self.strategy = strategy_class(villager_number, wolf_number, lunatic_number,
+                                       self.random)
+        if selection not in strategy.SELECTION_MODES:
+            raise ValueError("Invalid selection.", selection)
+        self.strategy.selection = selection
+        self.minimize = minimize
+
+    def generate_problem(self, max_iteration=100, observer=None):
         """ Generate the problems.
 
         :param max_iteration: the maximum iterations.  
+        :param observer: :class:`observer.GenerationObserver`, which receives 
+                         the event of every iteration. 
         :return: ``True``, if generated, otherwise, ``False``. 
         """
-        self.answer = self.strategy.generate_problem(self.index_to_player, max_iteration)
-        self.index_to_player = self._revise_person_id(self.index_to_player)
-        self.answer = self.strategy.generate_problem(self.index_to_player, 1)
+        answer = self.strategy.generate_problem(self.index_to_player, max_iteration, observer)
+        self._finish_problem(answer)
+
+    def generate_mutated(self, parent, max_iteration=100, observer=None,
+                         mutation_number=strategy.MUTATION_NUMBER):
+        """ Generate the problem from a converged one, instead of the empty claims.
+        The players of ``parent`` are reordered by :func:`strategy.Strategy.warm_start_order`,
+        a few claims are mutated by :func:`strategy.Strategy.mutate_claims`,
+        and then, the claims are added or deleted until the answer is unique again.
+        If the problem converges back to ``parent``, one more claim is mutated at every retry.
+        If the strategy cannot continue ``parent``, the problem is generated from scratch.
+        Either way, the problem is not isomorphic to ``parent``.
+
+        :param parent: :class:`PuzzleGenereator`, whose problem is generated.
+        :param mutation_number: the number of the mutated claims at the first attempt.
+        :raise RuntimeError: if not generated, or the problem is isomorphic to ``parent``
+                             after ``MUTATION_ATTEMPTS`` attempts.
+        """
+        numbers = (self.villager_number, self.wolf_number, self.lunatic_number)
+        if (parent.villager_number, parent.wolf_number, parent.lunatic_number) != numbers:
+            raise ValueError("The numbers of roles are different from the parent.")
+        role_solver = RoleSolver.from_players(parent.index_to_player, *numbers)
+        if role_solver.count(strategy.UNIQUENESS_LIMIT) != 1:
+            raise ValueError("The answer of the parent is not unique.")
+        villager_mask, wolf_mask = next(role_solver.iter_solutions())
+        order = self.strategy.warm_start_order(parent.index_to_player, villager_mask, wolf_mask)
+        if order is not None:
+            self.claim_matrix = parent.claim_matrix.permute(order)
+            self.index_to_player = self.claim_matrix.create_players()
+            villager_mask = sum(1 << position for position, index in enumerate(order)
+                                if (villager_mask >> index) & 1)
+        parent_hash = parent.puzzle_hash
+        if parent_hash is None:
+            parent_hash = canonical.canonical_hash(parent)
+        for attempt in range(MUTATION_ATTEMPTS):
+            if order is None:
+                self.index_to_player = self._initialize_players()
+            else:
+                self.strategy.mutate_claims(self.index_to_player, mutation_number + attempt,
+                                            villager_mask)
+            answer = self.strategy.generate_problem(self.index_to_player, max_iteration, observer)
+            if self.minimize:
+                self.strategy.minimize_claims(self.index_to_player)
+            # The canonical form does not depend on the ids, so it is compared before revising them.
+            self.puzzle_hash = canonical.canonical_hash(self)
+            if self.puzzle_hash != parent_hash:
+                break
+            if order is not None:
+                role_solver = RoleSolver.from_players(self.index_to_player, *numbers)
+                villager_mask, _ = next(role_solver.iter_solutions())
+        else:
+            raise RuntimeError("The problem is isomorphic to the parent.")
+        self._relabel_problem(answer)
+
+    def _finish_problem(self, answer):
+        """ Minimize the claims if required, and relabel the converged problem.
+        """
+        if self.minimize:
+            self.strategy.minimize_claims(self.index_to_player)
+        self._relabel_problem(answer)
+
+    def _relabel_problem(self, answer):
+        """ Revise the ids of the converged problem, and relabel the answer.
+        """
+        self.index_to_player, replace_map = self._revise_person_id(self.index_to_player)
+        # The answer is known, so it is only relabelled instead of being solved again.
+        self.answer = dict(answer)
+        self.answer["wolf_indices"] = sorted(replace_map[index]
+                                             for index in answer["wolf_indices"])
+        # The cached coherent cases are of the previous ids.
+        self.strategy.reset_candidates()
+
+    @classmethod
+    def restore(cls, claim_matrix, villager_number, wolf_number, lunatic_number,
+                wolf_indices, lang="en", strategy_mode=None):
+        """ Restore the generated puzzle from its claims and answer, without generation.
+
+        :param claim_matrix: :class:`player.ClaimMatrix` of the revised ids.
+        :param wolf_indices: the indices of the wolves of the answer.
+        """
+        puzzle_generator = cls(villager_number, wolf_number, lunatic_number,
+                               lang, strategy_mode)
+        if len(claim_matrix) != len(puzzle_generator.index_to_player):
+            raise ValueError("The number of players is inconsistent.", len(claim_matrix))
+        puzzle_generator.claim_matrix = claim_matrix
+        puzzle_generator.index_to_player = claim_matrix.create_players()
+        puzzle_generator.answer = {"wolf_indices": sorted(wolf_indices)}
+        return puzzle_generator
         
     def display_problems(self):
         """ Display the problems.
@@ -68,9 +194,9 @@ class PuzzleGenereator(object):
     
     def _initialize_players(self):
         total_players = self.villager_number + self.wolf_number + self.lunatic_number
-        player_list = [Player(index) for index in range(total_players)]
-        index_to_player = {index: elem for index, elem in enumerate(player_list)}
-                
+        self.claim_matrix = ClaimMatrix(total_players)
+        index_to_player = self.claim_matrix.create_players()
+
         return index_to_player
 
     def _create_introduction(self):
@@ -127,48 +253,33 @@ class PuzzleGenereator(object):
 
     def _revise_person_id(self, index_to_player):
         """ Sort the persons' id, by the order of the number of claims. 
+        The rows and columns of :class:`player.ClaimMatrix` are permuted into the revised ids.
 
-        :return: the changed index_to_player.
-        
+        :return: ``(index_to_player, replace_map)``, the changed index_to_player and 
+                 ``dict`` from the previous id to the revised one.
         """
-        def _replace_player_result_ids(player, replace_map):
-            player.index = replace_map[player.index]
-            revised_result = dict()
-            revised_result = {replace_map[prev_id]: result_id
-                              for prev_id, result_id in player.result.items()}
-            player.result = revised_result
-            player.result[player.index] = WhiteResult.get_id()
-            return player
-
-        indices = self.index_to_player.keys()
+        indices = index_to_player.keys()
         indices = sorted(indices,
-                         key=lambda index: len(self.index_to_player[index].result.keys()),
+                         key=lambda index: len(index_to_player[index].result),
                          reverse=True)
 
         replace_map = {original_id: index for index, original_id 
                        in enumerate(indices)}  
 
-        revised_index_to_player = dict()
-        for prev_index, person in self.index_to_player.items():
-            person = _replace_player_result_ids(person, replace_map)
-
-            next_index = replace_map[prev_index]
-            revised_index_to_player[next_index] = person
-        
-        return revised_index_to_player
+        self.claim_matrix = self.claim_matrix.permute(indices)
+        return self.claim_matrix.create_players(), replace_map
 
 
 def _create_player_claim(person, lang="en"):
-    def _index_to_result(index):
+    string_dict = {WHITE_CODE: "○", BLACK_CODE: "●"}
+
+    def _index_to_result(index, code):
         alphabet = _index_to_alphabet(index)
-        result_id = person.result[index]
-        string_dict = {WhiteResult.get_id(): "○", BlackResult.get_id(): "●"}
-        result_string = string_dict[result_id]
+        result_string = string_dict[code]
         return "{0}{1}".format(alphabet, result_string)
 
-    indices = sorted(person.result.keys())
-    indices = [index for index in indices if index != person.index]
-    result_list = [_index_to_result(index) for index in indices]
+    result_list = [_index_to_result(index, code) for index, code in person.result.iter_codes()
+                   if index != person.index]
 
     my_alphabet = _index_to_alphabet(person.index)
 
@@ -179,6 +290,248 @@ def _create_player_claim(person, lang="en"):
     return "{0}:".format(claim) + ",".join(result_list)
 
 
+def generate_one(villager_number, wolf_number, lunatic_number,
+                 lang="en", strategy_mode=None, max_iteration=100, seed=0, max_attempts=10,
+                 selection="random", minimize=False, deadline=None):
+    """ Generate one puzzle, retrying with the seeds of :func:`iter_generate_many`.
+    This is picklable, so it can be submitted to a process pool as it is.
+
+    :param deadline: the wall-clock limit in seconds, checked at every iteration.
+                     If ``None``, only ``max_iteration`` and ``max_attempts`` limit.
+    :return: generated :class:`PuzzleGenereator`.
+    :raise RuntimeError: if no attempt converges within the limits.
+    """
+    end_time = None if deadline is None else time.time() + deadline
+    cancel_observer = None if end_time is None else _CancelObserver(None, end_time)
+    for attempt in range(max_attempts):
+        generator = PuzzleGenereator(villager_number, wolf_number, lunatic_number,
+                                     lang, strategy_mode,
+                                     seed=seed + attempt * ATTEMPT_SEED_STRIDE,
+                                     selection=selection, minimize=minimize)
+        try:
+            generator.generate_problem(max_iteration=max_iteration, observer=cancel_observer)
+        except RuntimeError:
+            continue
+        except _CancelledError:
+            raise RuntimeError("Cannot generate the problem within the deadline.", seed)
+        return generator
+    raise RuntimeError("Cannot generate the problem.", seed)
+
+
+def generate_many(villager_number, wolf_number, lunatic_number, count,
+                  lang="en", strategy_mode=None, max_iteration=100,
+                  jobs=None, seed=0, max_attempts=10, dedupe=None, selection="random",
+                  minimize=False, warm_start=False):
+    """ Generate the puzzles across a process pool.
+
+    :return: ``list`` of generated :class:`PuzzleGenereator`, in order.
+    Refer to :func:`iter_generate_many` for the parameters.
+    """
+    return list(iter_generate_many(villager_number, wolf_number, lunatic_number, count,
+                                   lang, strategy_mode, max_iteration,
+                                   jobs, seed, max_attempts, dedupe=dedupe,
+                                   selection=selection, minimize=minimize,
+                                   warm_start=warm_start))
+
+
+def iter_generate_many(villager_number, wolf_number, lunatic_number, count,
+                       lang="en", strategy_mode=None, max_iteration=100,
+                       jobs=None, seed=0, max_attempts=10, chunksize=8, dedupe=None,
+                       selection="random", minimize=False, warm_start=False):
+    """ Yield the generated puzzles in order, as soon as each of them is ready.
+
+    The ``index``-th puzzle is generated with the seed ``seed + index``. 
+    If it fails, the seed is advanced by ``ATTEMPT_SEED_STRIDE`` and it is retried,
+    at most ``max_attempts`` times.
+    Hence, the results are reproducible regardless of ``jobs``.
+
+    :param count: the number of puzzles.
+    :param jobs: the number of worker processes. If ``None``, all the cores are used.
+    :param chunksize: the number of puzzles sent to a worker at once.
+    :param dedupe: :class:`canonical.DedupeIndex`. If given, the puzzles isomorphic to 
+                   the ones in the index are skipped, and the following seeds are used instead.
+    :param selection: the mode of selecting claims, either of ``strategy.SELECTION_MODES``.
+    :param minimize: if ``True``, the claims which are not needed for the uniqueness are removed.
+    :param warm_start: if ``True``, every puzzle of a chunk but the first is derived
+                       from the previous one by :func:`PuzzleGenereator.generate_mutated`.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    arguments = (villager_number, wolf_number, lunatic_number,
+                 lang, strategy_mode, max_iteration, max_attempts, dedupe is not None,
+                 selection, minimize, warm_start)
+    seed_number = count if dedupe is None else count * max_attempts
+    seed_chunks = (list(range(seed + start, seed + min(start + chunksize, seed_number)))
+                   for start in range(0, seed_number, chunksize))
+
+    produced = 0
+    for generator in _iter_generated_chunks(arguments, seed_chunks, jobs):
+        if produced == count:
+            return
+        if dedupe is not None and not dedupe.add(generator.puzzle_hash):
+            continue
+        produced += 1
+        yield generator
+    if produced < count:
+        raise RuntimeError("Cannot generate enough distinct problems.", produced)
+
+
+def _iter_generated_chunks(arguments, seed_chunks, jobs):
+    # The workers read the assignment table from one shared segment instead of building it.
+    numbers = arguments[:3]
+    shared = None
+    if jobs > 1 and strategy.uses_bitset(*numbers):
+        shared = assignment_table(*numbers).share()
+    shared_name = None if shared is None else shared.name
+    try:
+        for generators in iter_bounded_map(partial(_generate_chunk, arguments), seed_chunks,
+                                           jobs, initializer=_attach_assignment_table,
+                                           initargs=(shared_name, numbers)):
+            yield from generators
+    finally:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+
+
+def _attach_assignment_table(shared_name, numbers):
+    if shared_name is not None:
+        install_assignment_table(AssignmentTable.attach(shared_name, numbers))
+
+
+def _generate_chunk(arguments, seeds):
+    """ Generate the puzzles of ``seeds`` in a worker process.
+    """
+    (villager_number, wolf_number, lunatic_number,
+     lang, strategy_mode, max_iteration, max_attempts, with_hash, selection,
+     minimize, warm_start) = arguments
+    create_generator = partial(PuzzleGenereator, villager_number, wolf_number, lunatic_number,
+                               lang, strategy_mode, selection=selection, minimize=minimize)
+    generators = list()
+    for seed in seeds:
+        for attempt in range(max_attempts):
+            attempt_seed = seed + attempt * ATTEMPT_SEED_STRIDE
+            generator = None
+            if warm_start and generators:
+                generator = create_generator(seed=attempt_seed)
+                try:
+                    generator.generate_mutated(generators[-1], max_iteration=max_iteration)
+                except RuntimeError:
+                    # The derivation failed, so the seed is generated from scratch.
+                    generator = None
+            if generator is None:
+                generator = create_generator(seed=attempt_seed)
+                try:
+                    generator.generate_problem(max_iteration=max_iteration)
+                except RuntimeError:
+                    continue
+            if with_hash and generator.puzzle_hash is None:
+                generator.puzzle_hash = canonical.canonical_hash(generator)
+            generators.append(generator)
+            break
+        else:
+            raise RuntimeError("Cannot generate the problem.", seed)
+    return generators
+
+
+def generate_racing(villager_number, wolf_number, lunatic_number,
+                    lang="en", strategy_mode=None, max_iteration=100,
+                    jobs=None, seed=0, deadline=None, max_attempts=100, selection="random",
+                    minimize=False):
+    """ Generate one puzzle, racing restarted random walks across processes.
+
+    The ``worker``-th process tries the seeds ``seed + worker``, ``seed + worker + jobs``, ...
+    and the first puzzle which converges is returned. The other workers are cancelled.
+    Which worker wins depends on timing, but the seed of the result is kept in ``seed``.
+
+    :param jobs: the number of worker processes. If ``None``, all the cores are used.
+    :param deadline: the wall-clock limit in seconds. If ``None``, only ``max_attempts`` limits.
+    :param max_attempts: the maximum attempts per worker.
+    :return: generated :class:`PuzzleGenereator`.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    end_time = None if deadline is None else time.time() + deadline
+    arguments = (villager_number, wolf_number, lunatic_number, lang, strategy_mode,
+                 max_iteration, max_attempts, selection, minimize, end_time)
+
+    if jobs == 1:
+        generator = _race(arguments, seed, 1)
+    else:
+        stop_event = multiprocessing.Event()
+        executor = ProcessPoolExecutor(jobs, initializer=_initialize_racer,
+                                       initargs=(stop_event,))
+        try:
+            pending = {executor.submit(_race, arguments, seed + worker, jobs)
+                       for worker in range(jobs)}
+            generator = None
+            while pending and generator is None:
+                timeout = None if end_time is None else max(0, end_time - time.time())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.result() is not None:
+                        generator = future.result()
+                        break
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    if generator is None:
+        raise RuntimeError("Cannot generate the problem within the limits.")
+    return generator
+
+
+class _CancelledError(Exception):
+    pass
+
+
+class _CancelObserver(GenerationObserver):
+    """ Observer which stops the generation when the race is over or the deadline passes.
+    """
+
+    def __init__(self, stop_event, end_time):
+        self.stop_event = stop_event
+        self.end_time = end_time
+
+    def on_iteration(self, event):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise _CancelledError()
+        if self.end_time is not None and time.time() > self.end_time:
+            raise _CancelledError()
+
+
+_STOP_EVENT = None
+
+
+def _initialize_racer(stop_event):
+    global _STOP_EVENT
+    _STOP_EVENT = stop_event
+
+
+def _race(arguments, first_seed, stride):
+    """ Try the seeds ``first_seed``, ``first_seed + stride``, ... until one converges.
+
+    :return: generated :class:`PuzzleGenereator`, or ``None`` if cancelled or exhausted.
+    """
+    (villager_number, wolf_number, lunatic_number, lang, strategy_mode,
+     max_iteration, max_attempts, selection, minimize, end_time) = arguments
+    cancel_observer = _CancelObserver(_STOP_EVENT, end_time)
+    for attempt in range(max_attempts):
+        generator = PuzzleGenereator(villager_number, wolf_number, lunatic_number,
+                                     lang, strategy_mode, seed=first_seed + attempt * stride,
+                                     selection=selection, minimize=minimize)
+        try:
+            generator.generate_problem(max_iteration=max_iteration, observer=cancel_observer)
+        except RuntimeError:
+            continue
+        except _CancelledError:
+            return None
+        return generator
+    return None
+
+
 def create_parser():
     """ Create argparser.
     """
@@ -202,6 +555,44 @@ def create_parser():
     parser.add_argument('-strategy_mode', default=None,
                         help="the strategy_mode", choices=list(mode_keys) + [None])
 
+    parser.add_argument('-selection', type=str, default="random",
+                        help="the mode of selecting claims", choices=list(strategy.SELECTION_MODES))
+
+    parser.add_argument('-count', type=int,
+                        help="the number of puzzles", default=1)
+
+    parser.add_argument('-jobs', type=int,
+                        help="the number of worker processes (default: all the cores)",
+                        default=None)
+
+    format_keys = export.get_formatter_map().keys()
+    parser.add_argument('-format', type=str, default="markdown",
+                        help="the output format", choices=list(format_keys))
+
+    parser.add_argument('-unique', action="store_true",
+                        help="skip the puzzles isomorphic to the already generated ones")
+
+    parser.add_argument('-trace', type=str, default=None,
+                        help="the path, into which the JSON trace of iterations is dumped "
+                             "(only for a single puzzle)")
+
+    parser.add_argument('-minimize', action="store_true",
+                        help="remove the claims which are not needed for the unique answer")
+
+    parser.add_argument('-warm', action="store_true",
+                        help="derive every puzzle from the previous one in a batch, "
+                             "instead of generating it from scratch")
+
+    parser.add_argument('-race', action="store_true",
+                        help="race restarted generations across processes (only for a single puzzle)")
+
+    parser.add_argument('-deadline', type=float, default=None,
+                        help="the wall-clock limit in seconds of racing, which implies -race")
+
+    parser.add_argument('-seed', type=int,
+                        help="the seed, which makes the generation reproducible",
+                        default=None)
+
     return parser
 
 
@@ -216,10 +607,38 @@ if __name__ == "__main__":
     max_iter = args.max_iteration
     strategy_mode = args.strategy_mode
 
-    puzzle_generator = PuzzleGenereator(villager_number, wolf_number, lunatic_number,
-                                        lang, strategy_mode) 
-    puzzle_generator.generate_problem(max_iteration=max_iter)
-    problem_text = puzzle_generator.display_problems()
-    answer_text = puzzle_generator.display_answers()
-    print(problem_text)
-    print(answer_text)
+    if args.count == 1 and (args.race or args.deadline is not None):
+        seed = 0 if args.seed is None else args.seed
+        try:
+            puzzle_generator = generate_racing(villager_number, wolf_number, lunatic_number,
+                                               lang, strategy_mode, max_iter,
+                                               jobs=args.jobs, seed=seed, deadline=args.deadline,
+                                               selection=args.selection, minimize=args.minimize)
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        puzzle_generators = [puzzle_generator]
+    elif args.count == 1:
+        puzzle_generator = PuzzleGenereator(villager_number, wolf_number, lunatic_number,
+                                            lang, strategy_mode, seed=args.seed,
+                                            selection=args.selection, minimize=args.minimize)
+        trace_observer = None if args.trace is None else TraceObserver(keep_events=True)
+        try:
+            puzzle_generator.generate_problem(max_iteration=max_iter, observer=trace_observer)
+        finally:
+            if trace_observer is not None:
+                with open(args.trace, "w") as fp:
+                    trace_observer.dump_json(fp)
+        puzzle_generators = [puzzle_generator]
+    else:
+        seed = 0 if args.seed is None else args.seed
+        puzzle_generators = iter_generate_many(villager_number, wolf_number, lunatic_number,
+                                               args.count, lang, strategy_mode, max_iter,
+                                               jobs=args.jobs, seed=seed,
+                                               dedupe=canonical.DedupeIndex() if args.unique else None,
+                                               selection=args.selection,
+                                               minimize=args.minimize,
+                                               warm_start=args.warm)
+
+    output_formatter = export.choose_formatter(args.format)()
+    output_formatter.write(puzzle_generators, sys.stdout)
@@ -0,0 +1,205 @@
+""" Ranking and unranking of the assignments of roles.
+
+The assignments are numbered in the order of :func:`coherence.iter_assignment_masks`,
+that is, of :func:`strategy._multiple_combination`, by the combinatorial number system.
+Hence, the ``rank``-th assignment is reached without walking the earlier ones,
+and the assignment space can be split into contiguous ranges of ranks,
+which are searched in parallel by :func:`count_coherent_sharded`.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from math import comb
+
+from coherence import assignment_count
+
+
+def rank_combination(n, positions):
+    """ Return the lexicographic rank of the combination among all the combinations
+    of ``len(positions)`` elements out of ``range(n)``.
+
+    :param positions: the sorted positions.
+    """
+    rank = 0
+    start = 0
+    rest = len(positions)
+    for position in positions:
+        for skipped in range(start, position):
+            rank += comb(n - skipped - 1, rest - 1)
+        start = position + 1
+        rest -= 1
+    return rank
+
+
+def unrank_combination(n, k, rank):
+    """ Return the sorted positions of the ``rank``-th combination
+    of ``k`` elements out of ``range(n)``.
+    """
+    if not 0 <= rank < comb(n, k):
+        raise ValueError("rank {0} is out of range.".format(rank))
+    positions = list()
+    position = 0
+    while k:
+        # The number of the combinations whose next element is ``position``.
+        number = comb(n - position - 1, k - 1)
+        if rank < number:
+            positions.append(position)
+            k -= 1
+        else:
+            rank -= number
+        position += 1
+    return positions
+
+
+def rank_assignment(villager_number, wolf_number, lunatic_number, villager_mask, wolf_mask):
+    """ Return the rank of the assignment ``(villager_mask, wolf_mask)``.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    villager_positions = [index for index in range(total) if (villager_mask >> index) & 1]
+    remain_indices = [index for index in range(total) if not (villager_mask >> index) & 1]
+    wolf_positions = [position for position, index in enumerate(remain_indices)
+                      if (wolf_mask >> index) & 1]
+    if len(villager_positions) != villager_number or len(wolf_positions) != wolf_number:
+        raise ValueError("The masks do not match the numbers of roles.")
+    wolf_block = comb(total - villager_number, wolf_number)
+    return (rank_combination(total, villager_positions) * wolf_block +
+            rank_combination(total - villager_number, wolf_positions))
+
+
+def unrank_assignment(villager_number, wolf_number, lunatic_number, rank):
+    """ Return the ``rank``-th assignment as ``(villager_mask, wolf_mask)``.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    wolf_block = comb(total - villager_number, wolf_number)
+    if not 0 <= rank < comb(total, villager_number) * wolf_block:
+        raise ValueError("rank {0} is out of range.".format(rank))
+    villager_rank, wolf_rank = divmod(rank, wolf_block)
+    villager_positions = unrank_combination(total, villager_number, villager_rank)
+    villager_mask = _positions_to_mask(range(total), villager_positions)
+    remain_indices = [index for index in range(total) if not (villager_mask >> index) & 1]
+    wolf_positions = unrank_combination(len(remain_indices), wolf_number, wolf_rank)
+    return villager_mask, _positions_to_mask(remain_indices, wolf_positions)
+
+
+def iter_assignment_range(villager_number, wolf_number, lunatic_number, start, stop):
+    """ Yield the assignments whose ranks are in ``range(start, stop)``,
+    as ``(villager_mask, wolf_mask)``.
+    Only the first one is unranked, and the others are reached by the successors.
+    """
+    stop = min(stop, assignment_count(villager_number, wolf_number, lunatic_number))
+    if start >= stop:
+        return
+    total = villager_number + wolf_number + lunatic_number
+    wolf_block = comb(total - villager_number, wolf_number)
+    villager_rank, wolf_rank = divmod(start, wolf_block)
+    rest = stop - start
+
+    villager_start = unrank_combination(total, villager_number, villager_rank)
+    for villager_positions in _iter_combinations_from(total, villager_start):
+        villager_mask = _positions_to_mask(range(total), villager_positions)
+        remain_indices = [index for index in range(total)
+                          if not (villager_mask >> index) & 1]
+        wolf_start = unrank_combination(len(remain_indices), wolf_number, wolf_rank)
+        for wolf_positions in _iter_combinations_from(len(remain_indices), wolf_start):
+            yield villager_mask, _positions_to_mask(remain_indices, wolf_positions)
+            rest -= 1
+            if rest == 0:
+                return
+        wolf_rank = 0
+
+
+def shard_ranges(number, shards):
+    """ Split ``range(number)`` into at most ``shards`` contiguous ranges.
+
+    :return: ``list`` of ``(start, stop)``.
+    """
+    shards = max(1, min(shards, number))
+    size, remainder = divmod(number, shards)
+    ranges = list()
+    start = 0
+    for shard in range(shards):
+        stop = start + size + (1 if shard < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def count_coherent_range(claim_masks, numbers, start, stop, limit=None):
+    """ Count the coherent assignments whose ranks are in ``range(start, stop)``.
+
+    :param numbers: ``(villager_number, wolf_number, lunatic_number)``.
+    :param limit: the upper bound of counting. If ``None``, all the cases are counted.
+    """
+    number = 0
+    for villager_mask, wolf_mask in iter_assignment_range(*numbers, start, stop):
+        if claim_masks.is_coherent(villager_mask, wolf_mask):
+            number += 1
+            if limit is not None and number >= limit:
+                return limit
+    return number
+
+
+def count_coherent_sharded(claim_masks, villager_number, wolf_number, lunatic_number,
+                           limit=None, jobs=None, shards=None):
+    """ Count the coherent assignments, searching the ranges of ranks across processes.
+    When ``limit`` is reached, the remaining shards are cancelled.
+
+    :param claim_masks: :class:`coherence.ClaimMasks`.
+    :param limit: the upper bound of counting. If ``None``, all the cases are counted.
+    :param jobs: the number of worker processes. If ``None``, all the cores are used.
+    :param shards: the number of ranges. If ``None``, ``4 * jobs``.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if shards is None:
+        shards = 4 * jobs
+    numbers = (villager_number, wolf_number, lunatic_number)
+    ranges = shard_ranges(assignment_count(*numbers), shards)
+
+    if jobs == 1:
+        number = 0
+        for start, stop in ranges:
+            rest = None if limit is None else limit - number
+            number += count_coherent_range(claim_masks, numbers, start, stop, rest)
+            if limit is not None and number >= limit:
+                return limit
+        return number
+
+    number = 0
+    executor = ProcessPoolExecutor(jobs)
+    try:
+        pending = {executor.submit(count_coherent_range, claim_masks, numbers,
+                                   start, stop, limit)
+                   for start, stop in ranges}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            number += sum(future.result() for future in done)
+            if limit is not None and number >= limit:
+                return limit
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return number
+
+
+def _positions_to_mask(indices, positions):
+    mask = 0
+    for position in positions:
+        mask |= 1 << indices[position]
+    return mask
+
+
+def _iter_combinations_from(n, positions):
+    """ Yield the combinations out of ``range(n)`` in the lexicographic order,
+    starting from ``positions``.
+    """
+    positions = list(positions)
+    k = len(positions)
+    while True:
+        yield positions
+        index = k - 1
+        while index >= 0 and positions[index] == n - k + index:
+            index -= 1
+        if index < 0:
+            return
+        positions[index] += 1
+        for following in range(index + 1, k):
+            positions[following] = positions[following - 1] + 1
@@ -1,6 +1,11 @@
 """ Result classes.
 """
 
+# Integer codes of results, used in the compact claim matrix.
+UNKNOWN_CODE = 0
+WHITE_CODE = 1
+BLACK_CODE = 2
+
 
 class AbstractResult(object):
     """ This class represents the claim of the other players.   
@@ -13,6 +18,10 @@ class AbstractResult(object):
     def get_id(cls):
         raise SyntaxError("Please Implement.")
 
+    @classmethod
+    def get_code(cls):
+        raise SyntaxError("Please Implement.")
+
 
 class WhiteResult(AbstractResult):
     def __init__(self):
@@ -22,6 +31,10 @@ class WhiteResult(AbstractResult):
     def get_id(cls):
         return "white"
 
+    @classmethod
+    def get_code(cls):
+        return WHITE_CODE
+
 
 class BlackResult(AbstractResult):
     def __init__(self):
@@ -30,3 +43,29 @@ class BlackResult(AbstractResult):
     @classmethod
     def get_id(cls):
         return "black"
+
+    @classmethod
+    def get_code(cls):
+        return BLACK_CODE
+
+
+_ID_TO_CODE = {WhiteResult.get_id(): WHITE_CODE, BlackResult.get_id(): BLACK_CODE}
+_CODE_TO_ID = {WHITE_CODE: WhiteResult.get_id(), BLACK_CODE: BlackResult.get_id()}
+
+
+def id_to_code(result_id):
+    """ Convert the id of result to its code.
+    """
+    try:
+        return _ID_TO_CODE[result_id]
+    except KeyError:
+        raise ValueError("Invalid result.", result_id)
+
+
+def code_to_id(code):
+    """ Convert the code of result to its id.
+    """
+    try:
+        return _CODE_TO_ID[code]
+    except KeyError:
+        raise ValueError("Invalid code.", code)
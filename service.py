@@ -0,0 +1,379 @@
+""" Asyncio service, which serves generated puzzles over HTTP.
+
+For every configuration ``(villager_number, wolf_number, lunatic_number, strategy_mode, lang)``,
+a :class:`PuzzlePool` keeps a bounded buffer of ready puzzles,
+and refills it continuously in a process pool.
+Hence, a request only pops a puzzle from the buffer, unless the buffer is exhausted.
+
+```
+python service.py -port 8080 -preload 4,1,2 -preload 7,2,2,master_wolf
+curl "http://127.0.0.1:8080/puzzle?villager=4&wolf=1&lunatics=2&lang=jp"
+curl "http://127.0.0.1:8080/puzzle?villager=4&wolf=1&lunatics=2&format=jsonl"
+curl "http://127.0.0.1:8080/metrics"
+```
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+import export
+import strategy
+from puzzle_generator import generate_one
+
+# The formats of the served puzzles, and their content types.
+CONTENT_TYPES = {"markdown": "text/markdown; charset=utf-8",
+                 "jsonl": "application/json; charset=utf-8"}
+
+# The seconds to wait after a failed generation, before the pool retries.
+FAILURE_BACKOFF = 1.0
+
+# The maximum number of players of a configuration.
+# Beyond it, a generation may take minutes (see "Large tables" of README).
+MAX_PLAYERS = 60
+
+
+class PuzzlePool(object):
+    """ Bounded buffer of the puzzles of one configuration, which is refilled continuously.
+
+    The buffered puzzles and the puzzles being generated are at most ``capacity`` in total,
+    so every popped puzzle frees a slot, and a refiller takes the slot.
+    The refill lag is the time from freeing a slot to putting a new puzzle into it.
+
+    :param service: :class:`PuzzleService`.
+    :param key: ``(villager_number, wolf_number, lunatic_number, strategy_mode, lang)``.
+    :param capacity: the number of the puzzles kept ready.
+    :param refillers: the number of the puzzles generated at once.
+    """
+
+    def __init__(self, service, key, capacity, refillers):
+        self.service = service
+        self.key = key
+        self.capacity = capacity
+        self.puzzles = asyncio.Queue()
+        self.slots = asyncio.Semaphore(capacity)
+        created = time.monotonic()
+        self.freed_times = deque([created] * capacity)
+
+        self.requests = 0
+        self.hits = 0
+        self.generated = 0
+        self.failed = 0
+        self.wait_time = 0.0
+        self.refill_lag_total = 0.0
+        self.refill_lag_max = 0.0
+        self.tasks = [asyncio.ensure_future(self._refill()) for _ in range(refillers)]
+
+    async def get(self):
+        """ Pop a ready puzzle, waiting for the refill if the buffer is empty.
+
+        :return: ``dict`` from the format to the text of the puzzle.
+        """
+        self.requests += 1
+        if not self.puzzles.empty():
+            self.hits += 1
+        start = time.monotonic()
+        puzzle = await self.puzzles.get()
+        self.wait_time += time.monotonic() - start
+        self.freed_times.append(time.monotonic())
+        self.slots.release()
+        return puzzle
+
+    async def _refill(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            freed_time = self.freed_times.popleft()
+            while True:
+                seed = self.service.next_seed()
+                try:
+                    puzzle = await loop.run_in_executor(self.service.executor, _generate_puzzle,
+                                                        self.service.parameters(self.key, seed))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    self.failed += 1
+                    print("Failed to generate the puzzle.", self.key, seed, error, file=sys.stderr)
+                    await asyncio.sleep(FAILURE_BACKOFF)
+                    continue
+                break
+            lag = time.monotonic() - freed_time
+            self.generated += 1
+            self.refill_lag_total += lag
+            self.refill_lag_max = max(self.refill_lag_max, lag)
+            self.puzzles.put_nowait(puzzle)
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def metrics(self):
+        """ Return the metrics as ``dict``, which is serializable into JSON.
+        """
+        record = dict()
+        record["villager_number"], record["wolf_number"], record["lunatic_number"], \
+            record["strategy_mode"], record["lang"] = self.key
+        record["capacity"] = self.capacity
+        record["buffered"] = self.puzzles.qsize()
+        record["requests"] = self.requests
+        record["hits"] = self.hits
+        record["hit_rate"] = self.hits / self.requests if self.requests else None
+        record["mean_wait"] = self.wait_time / self.requests if self.requests else None
+        record["generated"] = self.generated
+        record["failed"] = self.failed
+        record["mean_refill_lag"] = (self.refill_lag_total / self.generated
+                                     if self.generated else None)
+        record["max_refill_lag"] = self.refill_lag_max
+        return record
+
+
+class PuzzleService(object):
+    """ Pools of puzzles, which share one process pool.
+    It must be created in a running event loop.
+
+    :param capacity: the number of the puzzles kept ready per configuration.
+    :param jobs: the number of worker processes. If ``None``, all the cores are used.
+    :param max_pools: the maximum number of configurations.
+    :param timeout: the seconds to wait for a puzzle, if the buffer is empty.
+    :param deadline: the seconds of one generation in a worker, after which it is given up.
+                     If ``None``, only ``max_iteration`` and ``max_attempts`` limit.
+    :param seed: the first seed of the generations. If ``None``, it is chosen at random.
+    """
+
+    def __init__(self, capacity=8, jobs=None, max_iteration=100, max_attempts=10,
+                 selection="random", max_pools=16, timeout=30.0, deadline=10.0, seed=None):
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if selection not in strategy.SELECTION_MODES:
+            raise ValueError("Invalid selection.", selection)
+        self.capacity = capacity
+        self.jobs = jobs
+        self.max_iteration = max_iteration
+        self.max_attempts = max_attempts
+        self.selection = selection
+        self.max_pools = max_pools
+        self.timeout = timeout
+        self.deadline = deadline
+        self.executor = ProcessPoolExecutor(jobs)
+        self.pools = dict()
+        self._seed = random.SystemRandom().randrange(1 << 32) if seed is None else seed
+        self._started = time.monotonic()
+
+    def next_seed(self):
+        seed = self._seed
+        self._seed += 1
+        return seed
+
+    def parameters(self, key, seed):
+        """ Return the keyword arguments of :func:`puzzle_generator.generate_one`
+        for the configuration.
+        """
+        villager_number, wolf_number, lunatic_number, strategy_mode, lang = key
+        return dict(villager_number=villager_number, wolf_number=wolf_number,
+                    lunatic_number=lunatic_number, lang=lang, strategy_mode=strategy_mode,
+                    max_iteration=self.max_iteration, seed=seed,
+                    max_attempts=self.max_attempts, selection=self.selection,
+                    deadline=self.deadline)
+
+    def pool(self, key):
+        """ Return the pool of the configuration, which is created at the first time.
+
+        :raise ValueError: if the configuration is invalid, or too many pools exist.
+        """
+        pool = self.pools.get(key)
+        if pool is not None:
+            return pool
+        villager_number, wolf_number, lunatic_number, strategy_mode, lang = key
+        if min(villager_number, wolf_number, lunatic_number) < 0:
+            raise ValueError("Invalid numbers of roles.", key)
+        if villager_number <= wolf_number + lunatic_number:
+            raise ValueError("villager team  MUST be larger than the wolf one.", key)
+        if villager_number + wolf_number + lunatic_number > MAX_PLAYERS:
+            raise ValueError("Too many players.", MAX_PLAYERS)
+        if strategy_mode is not None and strategy_mode not in strategy.get_strategy_map():
+            raise ValueError("The corresponding strategy is not existent.", strategy_mode)
+        if lang not in ("en", "jp"):
+            raise ValueError("Invalid language.", lang)
+        if len(self.pools) >= self.max_pools:
+            raise ValueError("Too many configurations.", self.max_pools)
+        pool = PuzzlePool(self, key, self.capacity, min(self.capacity, self.jobs))
+        self.pools[key] = pool
+        return pool
+
+    async def get_puzzle(self, key):
+        """ Return the ready puzzle of the configuration.
+
+        :return: ``dict`` from the format to the text of the puzzle.
+        :raise asyncio.TimeoutError: if no puzzle is ready within ``timeout``.
+        """
+        return await asyncio.wait_for(self.pool(key).get(), self.timeout)
+
+    def metrics(self):
+        """ Return the metrics of all the pools as ``dict``.
+        """
+        pools = [pool.metrics() for pool in self.pools.values()]
+        requests = sum(pool["requests"] for pool in pools)
+        hits = sum(pool["hits"] for pool in pools)
+        record = dict()
+        record["uptime"] = time.monotonic() - self._started
+        record["requests"] = requests
+        record["hits"] = hits
+        record["hit_rate"] = hits / requests if requests else None
+        record["pools"] = pools
+        return record
+
+    async def close(self):
+        """ Stop refilling, and shut down the worker processes.
+        """
+        for pool in self.pools.values():
+            pool.cancel()
+        for pool in self.pools.values():
+            await asyncio.gather(*pool.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """ Handle one HTTP request, ``GET /puzzle?...`` or ``GET /metrics``.
+        """
+        try:
+            try:
+                request_line = await reader.readline()
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+            except ValueError:
+                # ``readline`` raises it when a line exceeds the limit of the stream.
+                status, content_type, body = (HTTPStatus.BAD_REQUEST, "text/plain",
+                                              "The request is too long.\n")
+            else:
+                status, content_type, body = await self._respond(request_line)
+            body = body.encode("utf-8")
+            header = ("HTTP/1.1 {0} {1}\r\n"
+                      "Content-Type: {2}\r\n"
+                      "Content-Length: {3}\r\n"
+                      "Connection: close\r\n\r\n").format(status.value, status.phrase,
+                                                          content_type, len(body))
+            writer.write(header.encode("ascii") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request_line):
+        """ Return ``(status, content_type, body)`` of the request.
+        """
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return HTTPStatus.BAD_REQUEST, "text/plain", "Invalid request.\n"
+        method, target, _ = parts
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, "text/plain", "Only GET is allowed.\n"
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            return HTTPStatus.OK, "application/json", json.dumps(self.metrics()) + "\n"
+        if url.path != "/puzzle":
+            return HTTPStatus.NOT_FOUND, "text/plain", "Not found.\n"
+
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            key = (int(query.get("villager", 4)), int(query.get("wolf", 1)),
+                   int(query.get("lunatics", 2)), query.get("strategy_mode"),
+                   query.get("lang", "en"))
+            format_key = query.get("format", "markdown")
+            if format_key not in CONTENT_TYPES:
+                raise ValueError("Invalid format.", format_key)
+            puzzle = await self.get_puzzle(key)
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, "text/plain", " ".join(map(str, error.args)) + "\n"
+        except asyncio.TimeoutError:
+            return HTTPStatus.SERVICE_UNAVAILABLE, "text/plain", "No puzzle is ready.\n"
+        return HTTPStatus.OK, CONTENT_TYPES[format_key], puzzle[format_key]
+
+
+def _generate_puzzle(parameters):
+    """ Generate one puzzle in a worker process, and render it in all the formats.
+
+    :param parameters: the keyword arguments of :func:`puzzle_generator.generate_one`.
+    """
+    generator = generate_one(**parameters)
+    return {format_key: export.choose_formatter(format_key)().format(generator)
+            for format_key in CONTENT_TYPES}
+
+
+def _parse_key(text):
+    """ Parse ``villager,wolf,lunatics[,strategy_mode[,lang]]`` of ``-preload``.
+    """
+    items = text.split(",")
+    if not 3 <= len(items) <= 5:
+        raise argparse.ArgumentTypeError("villager,wolf,lunatics[,strategy_mode[,lang]]")
+    strategy_mode = items[3] if len(items) > 3 and items[3] not in ("", "None") else None
+    lang = items[4] if len(items) > 4 else "en"
+    try:
+        return int(items[0]), int(items[1]), int(items[2]), strategy_mode, lang
+    except ValueError:
+        raise argparse.ArgumentTypeError("The numbers of roles must be integers.")
+
+
+async def serve(host, port, preload=(), **kwargs):
+    """ Serve the puzzles until cancelled.
+
+    :param preload: the configurations, whose pools are filled before the first request.
+    :param kwargs: the parameters of :class:`PuzzleService`.
+    """
+    service = PuzzleService(**kwargs)
+    for key in preload:
+        service.pool(key)
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def create_parser():
+    """ Create argparser.
+    """
+    parser = argparse.ArgumentParser(description="Service of Werewolves' Puzzles.")
+    parser.add_argument('-host', type=str, default="127.0.0.1",
+                        help="the address to listen")
+    parser.add_argument('-port', type=int, default=8080,
+                        help="the port to listen")
+    parser.add_argument('-capacity', type=int, default=8,
+                        help="the number of the puzzles kept ready per configuration")
+    parser.add_argument('-jobs', type=int, default=None,
+                        help="the number of worker processes (default: all the cores)")
+    parser.add_argument('-max_iteration', type=int, default=100,
+                        help="the maximum iterations for generator")
+    parser.add_argument('-selection', type=str, default="random",
+                        help="the mode of selecting claims", choices=list(strategy.SELECTION_MODES))
+    parser.add_argument('-timeout', type=float, default=30.0,
+                        help="the seconds to wait for a puzzle, if none is ready")
+    parser.add_argument('-deadline', type=float, default=10.0,
+                        help="the seconds of one generation, after which it is given up")
+    parser.add_argument('-preload', type=_parse_key, action="append", default=[],
+                        help="the configuration to fill at startup, "
+                             "villager,wolf,lunatics[,strategy_mode[,lang]]")
+    parser.add_argument('-seed', type=int, default=None,
+                        help="the first seed of the generations")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = create_parser()
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.preload,
+                          capacity=args.capacity, jobs=args.jobs,
+                          max_iteration=args.max_iteration, selection=args.selection,
+                          timeout=args.timeout, deadline=args.deadline, seed=args.seed))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,275 @@
+""" Constraint-propagating backtracking solver for the assignment of roles.
+
+Only villagers' claims constrain the roles, and wolves and lunatics are
+indistinguishable to any claim. Hence, every claimer is assumed to be either
+a villager or a non-villager, and the choice between a wolf and a lunatic is
+left to the completion, which is counted in the closed form.
+Once a player is assumed to be a villager,
+the players claimed black by him are forced to be wolves,
+and the players claimed white by him are forbidden to be wolves.
+A claimer who cannot be a villager any more is decided without branching,
+and branches are pruned when the forced roles do not fit the numbers of roles.
+"""
+import copy
+from itertools import combinations, islice
+from math import comb
+
+from result import WHITE_CODE
+from coherence import ClaimMasks, mask_to_indices, popcount as _popcount
+
+
+def _bits(mask):
+    """ Return the list of the single bits of ``mask``.
+    """
+    bits = list()
+    while mask:
+        bit = mask & -mask
+        bits.append(bit)
+        mask ^= bit
+    return bits
+
+
+class RoleSolver(object):
+    """ Solver which yields the coherent assignments as ``(villager_mask, wolf_mask)``.
+
+    :param claim_masks: :class:`coherence.ClaimMasks`.
+    """
+
+    def __init__(self, claim_masks, villager_number, wolf_number, lunatic_number):
+        self.total = len(claim_masks.white_masks)
+        assert villager_number + wolf_number + lunatic_number == self.total
+        self.villager_number = villager_number
+        self.wolf_number = wolf_number
+        self.lunatic_number = lunatic_number
+
+        # Claims about oneself (always white) do not constrain anything.
+        self.white_masks = [white & ~(1 << index)
+                            for index, white in enumerate(claim_masks.white_masks)]
+        self.black_masks = list(claim_masks.black_masks)
+
+        # The claimers are assigned first, the most talkative first,
+        # since the other players are determined combinatorially.
+        claimers = [index for index, _, _ in claim_masks.claimers]
+        self.order = sorted(claimers,
+                            key=lambda index: _popcount(self.white_masks[index] |
+                                                        self.black_masks[index]),
+                            reverse=True)
+        claimer_mask = 0
+        for index in claimers:
+            claimer_mask |= 1 << index
+        self.claimer_mask = claimer_mask
+        self.silent_mask = ((1 << self.total) - 1) & ~claimer_mask
+
+    @classmethod
+    def from_players(cls, index_to_player, villager_number, wolf_number, lunatic_number):
+        return cls(ClaimMasks.from_players(index_to_player),
+                   villager_number, wolf_number, lunatic_number)
+
+    def iter_solutions(self):
+        """ Yield the coherent assignments lazily.
+        """
+        for leaf in self._search(0, 0, 0, 0, 0):
+            yield from self._iter_completions(*leaf)
+
+    def count(self, limit=None):
+        """ Count the coherent assignments, stopping as soon as ``limit`` are found.
+        """
+        return self._count_leaves(self._search(0, 0, 0, 0, 0), limit)
+
+    def count_contradicting(self, from_index, to_index, code, limit=None):
+        """ Count the coherent assignments where ``from_index`` is a villager,
+        but his claim about ``to_index`` is wrong.
+        The claim must not be among the claims of this solver.
+
+        If the claims with the claim have the unique assignment, the claims without it
+        have another assignment if and only if this count is not 0,
+        since any other assignment must contradict the claim.
+
+        :param code: the code of the claim.
+        """
+        from_bit = 1 << from_index
+        forced_wolf = self.black_masks[from_index]
+        forced_non_wolf = self.white_masks[from_index] | from_bit
+        if code == WHITE_CODE:
+            forced_wolf |= 1 << to_index
+        else:
+            forced_non_wolf |= 1 << to_index
+        if forced_wolf & forced_non_wolf:
+            return 0
+
+        solver = self
+        if not self.claimer_mask & from_bit:
+            # The villager is decided before the search, so he is not left to the completion.
+            solver = copy.copy(self)
+            solver.claimer_mask |= from_bit
+            solver.silent_mask &= ~from_bit
+        if not solver._is_feasible(from_bit, 0, forced_wolf, forced_non_wolf):
+            return 0
+        return solver._count_leaves(solver._search(0, from_bit, 0, forced_wolf, forced_non_wolf),
+                                    limit)
+
+    def _count_leaves(self, leaves, limit):
+        number = 0
+        for leaf in leaves:
+            number += self._completion_count(*leaf)
+            if limit is not None and number >= limit:
+                return limit
+        return number
+
+    def _search(self, position, villager_mask, non_villager_mask, forced_wolf, forced_non_wolf):
+        """ Yield ``(villager_mask, non_villager_mask, forced_wolf, forced_non_wolf)``,
+        where all the claimers are decided.
+        """
+        decided = villager_mask | non_villager_mask
+        forced = forced_wolf & self.claimer_mask & ~decided
+        if not forced:
+            for index in self.order[position:]:
+                if (decided >> index) & 1:
+                    continue
+                if self.black_masks[index] & forced_non_wolf or \
+                        self.white_masks[index] & forced_wolf:
+                    forced = 1 << index
+                    break
+        if forced:
+            # The claimer who cannot be a villager is a non-villager without branching.
+            bit = forced & -forced
+            next_non_villager_mask = non_villager_mask | bit
+            if self._is_feasible(villager_mask, next_non_villager_mask,
+                                 forced_wolf, forced_non_wolf):
+                yield from self._search(position, villager_mask, next_non_villager_mask,
+                                        forced_wolf, forced_non_wolf)
+            return
+
+        while position < len(self.order) and (decided >> self.order[position]) & 1:
+            position += 1
+        if position == len(self.order):
+            yield villager_mask, non_villager_mask, forced_wolf, forced_non_wolf
+            return
+
+        index = self.order[position]
+        bit = 1 << index
+        next_position = position + 1
+
+        # Assume the player is a villager, and propagate the claims.
+        white = self.white_masks[index]
+        black = self.black_masks[index]
+        next_villager_mask = villager_mask | bit
+        next_forced_wolf = forced_wolf | black
+        next_forced_non_wolf = forced_non_wolf | white | bit
+        if not next_forced_wolf & next_forced_non_wolf and \
+                self._is_feasible(next_villager_mask, non_villager_mask,
+                                  next_forced_wolf, next_forced_non_wolf):
+            yield from self._search(next_position, next_villager_mask, non_villager_mask,
+                                    next_forced_wolf, next_forced_non_wolf)
+
+        # Assume the player is a wolf or a lunatic.
+        next_non_villager_mask = non_villager_mask | bit
+        if self._is_feasible(villager_mask, next_non_villager_mask,
+                             forced_wolf, forced_non_wolf):
+            yield from self._search(next_position, villager_mask, next_non_villager_mask,
+                                    forced_wolf, forced_non_wolf)
+
+    def _is_feasible(self, villager_mask, non_villager_mask, forced_wolf, forced_non_wolf):
+        """ Check whether the decided and forced roles fit the numbers of roles.
+        """
+        if _popcount(villager_mask) > self.villager_number:
+            return False
+        if _popcount(forced_wolf) > self.wolf_number:
+            return False
+        if _popcount(forced_non_wolf) > self.villager_number + self.lunatic_number:
+            return False
+        # The undecided claimers forced to be wolves will be non-villagers.
+        undecided = self.claimer_mask & ~villager_mask & ~non_villager_mask
+        if _popcount(non_villager_mask | (forced_wolf & undecided)) > \
+                self.wolf_number + self.lunatic_number:
+            return False
+        # The non-villagers forced not to be wolves are lunatics.
+        if _popcount(non_villager_mask & forced_non_wolf) > self.lunatic_number:
+            return False
+        # The remaining villagers and wolves must fit in the undecided players.
+        open_mask = undecided | self.silent_mask
+        if self.villager_number - _popcount(villager_mask) > \
+                _popcount(open_mask & ~forced_wolf):
+            return False
+        if self.wolf_number > _popcount((non_villager_mask | open_mask) & ~forced_non_wolf):
+            return False
+        return True
+
+    def _split_completion(self, non_villager_mask, forced_wolf, forced_non_wolf):
+        """ Split the players whose roles are not fixed yet.
+
+        :return: ``(fixed_wolf_mask, either_mask, silent_non_wolf_mask, silent_free_mask)``.
+                 The players of ``either_mask`` are wolves or lunatics,
+                 and the silent players of ``silent_non_wolf_mask`` are villagers or lunatics.
+        """
+        fixed_wolf = (non_villager_mask | self.silent_mask) & forced_wolf
+        either = non_villager_mask & ~forced_wolf & ~forced_non_wolf
+        silent_non_wolf = self.silent_mask & forced_non_wolf
+        silent_free = self.silent_mask & ~forced_wolf & ~forced_non_wolf
+        return fixed_wolf, either, silent_non_wolf, silent_free
+
+    def _completion_count(self, villager_mask, non_villager_mask, forced_wolf, forced_non_wolf):
+        """ Count the completions of the roles of a leaf.
+        The wolves are chosen from ``either`` and the free silent players,
+        and the remaining villagers from the silent non-wolves.
+        """
+        fixed_wolf, either, silent_non_wolf, silent_free = \
+            self._split_completion(non_villager_mask, forced_wolf, forced_non_wolf)
+        villager_rest = self.villager_number - _popcount(villager_mask)
+        wolf_rest = self.wolf_number - _popcount(fixed_wolf)
+        either_number = _popcount(either)
+        free_number = _popcount(silent_free)
+        non_wolf_number = _popcount(silent_non_wolf)
+        number = 0
+        for either_wolf in range(max(0, wolf_rest - free_number),
+                                 min(either_number, wolf_rest) + 1):
+            free_wolf = wolf_rest - either_wolf
+            number += comb(either_number, either_wolf) * comb(free_number, free_wolf) * \
+                comb(non_wolf_number + free_number - free_wolf, villager_rest)
+        return number
+
+    def _iter_completions(self, villager_mask, non_villager_mask, forced_wolf, forced_non_wolf):
+        """ Yield the completions of the roles of a leaf, as ``(villager_mask, wolf_mask)``.
+        """
+        fixed_wolf, either, _, silent_free = \
+            self._split_completion(non_villager_mask, forced_wolf, forced_non_wolf)
+        villager_rest = self.villager_number - _popcount(villager_mask)
+        wolf_rest = self.wolf_number - _popcount(fixed_wolf)
+        either_bits = _bits(either)
+        free_bits = _bits(silent_free)
+        for either_wolf in range(max(0, wolf_rest - len(free_bits)),
+                                 min(len(either_bits), wolf_rest) + 1):
+            for either_wolf_bits in combinations(either_bits, either_wolf):
+                for free_wolf_bits in combinations(free_bits, wolf_rest - either_wolf):
+                    wolf_mask = fixed_wolf | sum(either_wolf_bits) | sum(free_wolf_bits)
+                    villager_bits = _bits(self.silent_mask & ~wolf_mask)
+                    for bits in combinations(villager_bits, villager_rest):
+                        yield villager_mask | sum(bits), wolf_mask
+
+
+class SolverCandidates(object):
+    """ Coherent cases answered by :class:`RoleSolver`, without enumerating all the assignments.
+    This has the interface of the stores of :func:`strategy.Strategy.create_candidate_store`.
+    Its memory is bounded by the claims rather than by the number of the assignments.
+    """
+
+    def __init__(self, total, villager_number, wolf_number, lunatic_number):
+        self.total = total
+        self.numbers = (villager_number, wolf_number, lunatic_number)
+        self.solver = None
+
+    def sync(self, index_to_player):
+        self.solver = RoleSolver.from_players(index_to_player, *self.numbers)
+
+    def count(self, limit=None):
+        return self.solver.count(limit)
+
+    def iter_coherent_cases(self):
+        for _, wolf_mask in self.solver.iter_solutions():
+            yield {"wolf_indices": mask_to_indices(wolf_mask)}
+
+    def get_coherent_cases(self, limit=None):
+        return list(islice(self.iter_coherent_cases(), limit))
+
+    def sample_assignments(self, limit):
+        return list(islice(self.solver.iter_solutions(), limit))
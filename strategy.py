@@ -2,16 +2,64 @@
 """
 import random
 import math
-from itertools import combinations
+import time
+from itertools import combinations, islice
 
-from result import WhiteResult, BlackResult
+from result import (WhiteResult, BlackResult, WHITE_CODE, BLACK_CODE, UNKNOWN_CODE,
+                    code_to_id)
 from player import Player
+from coherence import (ClaimMasks, assignment_count, assignment_table,
+                       indices_to_mask, mask_to_indices, count_coherent_assignments,
+                       iter_coherent_assignments, find_swapped_assignment,
+                       TABLE_PLAYER_LIMIT)
+from solver import RoleSolver, SolverCandidates
+from bitset import BitsetCandidates
+import vectorized
+from observer import IterationEvent
 
 
 def _index_to_alphabet(index):
     """ Convert the index to the alphabet.
+    After ``Z``, two or more letters are used, ``AA``, ``AB``, ..., ``ZZ``, ``AAA``, ...
     """
-    return chr(ord("A") + index)
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+# The number of coherent cases, up to which :func:`Strategy.generate_problem` counts.
+# It is enough to know whether the case is unique or not.
+UNIQUENESS_LIMIT = 2
+
+# Above this number of the assignments of roles,
+# the backtracking solver is used instead of enumerating all the assignments.
+SOLVER_THRESHOLD = 1000
+
+# Up to this number of the assignments of roles, :func:`Strategy.generate_problem`
+# keeps the coherent cases as a bitset over all the assignments (see :mod:`bitset`),
+# as long as the players fit in ``coherence.TABLE_PLAYER_LIMIT``.
+BITSET_THRESHOLD = 1 << 16
+
+# The modes of selecting the claim to add.
+# ``"greedy"`` chooses the claim which best splits the coherent cases.
+SELECTION_MODES = ("random", "greedy")
+
+# The number of coherent cases, against which the claims are scored in greedy selection.
+GREEDY_SAMPLE_LIMIT = 64
+
+# The number of the claims flipped or moved, at deriving a problem from a converged one.
+MUTATION_NUMBER = 1
+
+
+def uses_bitset(villager_number, wolf_number, lunatic_number):
+    """ Return whether the coherent cases are kept as a bitset over the assignment table.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    return (total <= TABLE_PLAYER_LIMIT and
+            assignment_count(villager_number, wolf_number, lunatic_number) <= BITSET_THRESHOLD)
 
 
 def get_strategy_map():
@@ -37,42 +85,51 @@ def choose_strategy(mode_key):
 class Strategy(object):
     """ Strategy for the problem.
     When you create the new strategy, you should derive this class.  
+
+    :param rng: ``random.Random`` of all the random choices of this strategy.
+                If ``None``, a new one is created, so the global ``random`` is never touched.
     """
 
-    def __init__(self, villager_number, wolf_number, lunatic_number):
+    def __init__(self, villager_number, wolf_number, lunatic_number, rng=None):
         self.villager_number = villager_number
         self.wolf_number = wolf_number
         self.lunatic_number = lunatic_number
-        pass
+        # Either of ``SELECTION_MODES``.
+        self.selection = "random"
+        self.random = random.Random() if rng is None else rng
+        self._candidate_store = None
+        # ``(key, claim_masks)`` of the last claims, see :func:`claim_masks`.
+        self._claim_masks_cache = None
 
     def is_result_coherent(self, index_to_player, villager_indices, wolf_indices, lunatic_indices):
         """ Check whether the result is  coherent or not. 
 
         :return: ``True``, if the result is coherent. Otherwise, ``False``.
         """
-        def _coherent_check(p_result_dict):
-            for index_key, name_value in p_result_dict.items():
-                if index_key in wolf_indices:
-                    if name_value != BlackResult.get_id():
-                        return False
-                elif index_key in villager_indices:
-                    if name_value != WhiteResult.get_id():
-                        return False
-                elif index_key in lunatic_indices:
-                    if name_value != WhiteResult.get_id():
-                        return False
-                else:
-                    raise ValueError("Invalid", index_key)
-            return True
-
         assert len(villager_indices) == self.villager_number
         assert len(wolf_indices) == self.wolf_number
         assert len(lunatic_indices) == self.lunatic_number
 
-        if all([_coherent_check(index_to_player[v_index].result)
-                for v_index in villager_indices]):
-            return True
-        return False
+        masks = self.claim_masks(index_to_player)
+        villager_mask = indices_to_mask(villager_indices)
+        wolf_mask = indices_to_mask(wolf_indices)
+        role_mask = villager_mask | wolf_mask | indices_to_mask(lunatic_indices)
+        for index, white, black in masks.claimers:
+            if (villager_mask >> index) & 1 and (white | black) & ~role_mask:
+                raise ValueError("Invalid", mask_to_indices((white | black) & ~role_mask))
+        return masks.is_coherent(villager_mask, wolf_mask)
+
+    def claim_masks(self, index_to_player):
+        """ Return :class:`coherence.ClaimMasks` of the claims.
+        The masks are cached until the claims change, 
+        so that :func:`is_result_coherent` only compares the masks for every assignment.
+        """
+        # The codes are less than 0xff, so the separator keeps the key unambiguous.
+        key = b"\xff".join([index_to_player[index].result.row
+                             for index in range(len(index_to_player))])
+        if self._claim_masks_cache is None or self._claim_masks_cache[0] != key:
+            self._claim_masks_cache = (key, ClaimMasks.from_players(index_to_player))
+        return self._claim_masks_cache[1]
 
     def get_coherent_cases(self, index_to_player):
         """ Return the cases where the results are coherent.
@@ -81,28 +138,135 @@ class Strategy(object):
         :return: ``list``, in which each element is ``dict``.
                    which represents the (possible) coherent cases. 
         """
+        return list(self.iter_coherent_cases(index_to_player))
+
+    def iter_coherent_cases(self, index_to_player):
+        """ Yield the cases where the results are coherent, lazily.
+
+        If :func:`is_result_coherent` is not overridden, 
+        the bitmask engine of :mod:`coherence` is used, 
+        and for large configurations, the solver of :mod:`solver` is used.
+        If NumPy is installed, all the assignments are evaluated at once by :mod:`vectorized`
+        instead, up to ``vectorized.TABLE_LIMIT`` assignments, beyond the threshold of the solver.
+
+        :return: iterator of ``dict``, the same as the elements of :func:`get_coherent_cases`.
+        """
+        if not self._uses_bitmask_engine():
+            yield from self._iter_coherent_cases_by_lists(index_to_player)
+            return
+        numbers = (self.villager_number, self.wolf_number, self.lunatic_number)
+        if self._uses_solver() and not vectorized.is_applicable(*numbers):
+            yield from self._solver_candidates(index_to_player).iter_coherent_cases()
+            return
+
+        masks = self.claim_masks(index_to_player)
+        if vectorized.is_applicable(*numbers):
+            cases = vectorized.iter_coherent_assignments(masks, *numbers)
+        else:
+            cases = iter_coherent_assignments(masks, *numbers)
+        for _, wolf_mask in cases:
+            row = dict()
+            row["wolf_indices"] = mask_to_indices(wolf_mask)
+            yield row
 
-        coherent_ret_list = list()
-        indices = list(range(len(index_to_player)))
+    def count_coherent_cases(self, index_to_player, limit=None):
+        """ Count the coherent cases, stopping as soon as ``limit`` cases are found.
+
+        All the cases are counted by :mod:`vectorized` if it is applicable,
+        while the solver stops earlier at ``limit`` for large configurations.
+
+        :param limit: the upper bound of counting. If ``None``, all the cases are counted.
+        :return: ``int``, which is at most ``limit``.
+        """
+        if not self._uses_bitmask_engine():
+            return sum(1 for _ in islice(self.iter_coherent_cases(index_to_player), limit))
+        masks = self.claim_masks(index_to_player)
+        number = self._count_around_planted(masks, limit)
+        if number is not None:
+            return number
+        numbers = (self.villager_number, self.wolf_number, self.lunatic_number)
+        if limit is None and vectorized.is_applicable(*numbers):
+            return vectorized.count_coherent_assignments(masks, *numbers)
+        if self._uses_solver():
+            return self._solver_candidates(index_to_player).count(limit)
+        return count_coherent_assignments(masks, *numbers, limit)
+
+    def planted_assignment(self):
+        """ Return the assignment, around which the claims are made by this strategy,
+        as ``(villager_indices, wolf_indices)``.
+        If the strategy does not plant any assignment, ``None`` is returned.
+
+        The planted assignment is only a hint for counting: 
+        it is verified against the claims before it is used.
+        """
+        return None
 
-        number_list = [self.villager_number,
-                       self.wolf_number, self.lunatic_number]
-        for indices_list in _multiple_combination(indices, number_list):
-            villager_indices, wolf_indices, lunatic_indices = indices_list
+    def _count_around_planted(self, claim_masks, limit):
+        """ Count the coherent cases up to ``limit``, around :func:`planted_assignment`.
+        If the planted assignment is coherent, and another coherent one is made by swapping
+        the roles of two players, the cases are not unique without any search.
+
+        :return: ``int``, which is at most ``limit``, or ``None`` if the number is not decided.
+        """
+        planted = self.planted_assignment()
+        if planted is None or limit is None or limit > UNIQUENESS_LIMIT:
+            return None
+        villager_mask = indices_to_mask(planted[0])
+        wolf_mask = indices_to_mask(planted[1])
+        if not claim_masks.is_coherent(villager_mask, wolf_mask):
+            return None
+        if limit <= 1:
+            return limit
+        if find_swapped_assignment(claim_masks, villager_mask, wolf_mask) is not None:
+            return limit
+        return None
+
+    def _uses_bitmask_engine(self):
+        """ Return whether the coherence check is left to :mod:`coherence` or not.
+        """
+        return type(self).is_result_coherent is Strategy.is_result_coherent
+
+    def _uses_solver(self):
+        """ Return whether the number of the assignments is too large to enumerate.
+        """
+        return assignment_count(self.villager_number, self.wolf_number,
+                                self.lunatic_number) > SOLVER_THRESHOLD
+
+    def _solver_candidates(self, index_to_player):
+        candidates = SolverCandidates(len(index_to_player), self.villager_number,
+                                      self.wolf_number, self.lunatic_number)
+        candidates.sync(index_to_player)
+        return candidates
+
+    def _iter_coherent_cases_by_lists(self, index_to_player):
+        """ Yield the coherent cases, calling :func:`is_result_coherent` for every case.
+        """
+        all_mask = (1 << len(index_to_player)) - 1
+        table = assignment_table(self.villager_number, self.wolf_number, self.lunatic_number)
+        for villager_mask, wolf_mask in table:
+            villager_indices = mask_to_indices(villager_mask)
+            wolf_indices = mask_to_indices(wolf_mask)
+            lunatic_indices = mask_to_indices(all_mask & ~(villager_mask | wolf_mask))
             if self.is_result_coherent(index_to_player,
                                        villager_indices,
                                        wolf_indices,
                                        lunatic_indices):
                 row = dict()
                 row["wolf_indices"] = wolf_indices
-                coherent_ret_list.append(row)
-        return coherent_ret_list
+                yield row
 
     def add_claim(self, index_to_player):
         """ Add the one claim so that the possible cases should be restricted. 
+        If :attr:`selection` is ``"greedy"``, :func:`add_claim_greedily` is used.
+        If no player can claim more, one claim is deleted instead.
 
         :return: ``index_to_player``, into which one claim is added. 
         """
+        if self.selection == "greedy":
+            return self.add_claim_greedily(index_to_player)
+        if not self.candidate_from_indices(index_to_player):
+            return self.delete_claim(index_to_player)
+
         from_index, to_index = self.choose_add_pair_randomly(index_to_player)
         claim_id = self.choose_claim_randomly(
             index_to_player, from_index, to_index)
@@ -110,18 +274,110 @@ class Strategy(object):
         from_player.result[to_index] = claim_id
         return index_to_player
 
+    def add_claim_greedily(self, index_to_player):
+        """ Add the claim which leaves the fewest coherent cases without emptying them.
+        The candidates of claims are given by :func:`candidate_from_indices` and 
+        :func:`candidate_claims`, so the constraints of each strategy are preserved.
+        Claims are scored against at most ``GREEDY_SAMPLE_LIMIT`` coherent cases.
+
+        :return: ``index_to_player``, into which one claim is added. 
+        """
+        cases = self._sample_coherent_assignments(index_to_player)
+        if cases is None:
+            return self._add_claim_randomly(index_to_player)
+
+        black_id = BlackResult.get_id()
+        cases = [(villager_mask, mask_to_indices(wolf_mask)) for villager_mask, wolf_mask in cases]
+        best_claims = list()
+        best_number = None
+        for from_index in self.candidate_from_indices(index_to_player):
+            from_bit = 1 << from_index
+            from_player = index_to_player[from_index]
+            # Only the cases where the claimer is a villager are affected.
+            # ``wolf_numbers[to_index]`` is the number of such cases where the target is a wolf.
+            villager_case_number = 0
+            wolf_numbers = [0] * len(index_to_player)
+            for villager_mask, wolf_indices in cases:
+                if villager_mask & from_bit:
+                    villager_case_number += 1
+                    for wolf_index in wolf_indices:
+                        wolf_numbers[wolf_index] += 1
+            for to_index in index_to_player:
+                if to_index in from_player.result:
+                    continue
+                wolf_number = wolf_numbers[to_index]
+                for claim_id in self.candidate_claims(index_to_player, from_index, to_index):
+                    if claim_id == black_id:
+                        survivors = len(cases) - (villager_case_number - wolf_number)
+                    else:
+                        survivors = len(cases) - wolf_number
+                    if survivors == 0:
+                        continue
+                    if best_number is None or survivors < best_number:
+                        best_number = survivors
+                        best_claims = list()
+                    if survivors == best_number:
+                        best_claims.append((from_index, to_index, claim_id))
+
+        if not best_claims:
+            return self._add_claim_randomly(index_to_player)
+        from_index, to_index, claim_id = self.random.choice(best_claims)
+        index_to_player[from_index].result[to_index] = claim_id
+        return index_to_player
+
+    def _add_claim_randomly(self, index_to_player):
+        selection = self.selection
+        self.selection = "random"
+        try:
+            return self.add_claim(index_to_player)
+        finally:
+            self.selection = selection
+
+    def _sample_coherent_assignments(self, index_to_player):
+        """ Return at most ``GREEDY_SAMPLE_LIMIT`` coherent cases as ``(villager_mask, wolf_mask)``,
+        or ``None`` if the store of coherent cases does not support masks.
+        """
+        candidates = self._candidate_store
+        if candidates is None or candidates.total != len(index_to_player):
+            candidates = self.create_candidate_store(index_to_player)
+        candidates.sync(index_to_player)
+        return candidates.sample_assignments(GREEDY_SAMPLE_LIMIT)
+
+    def candidate_from_indices(self, index_to_player):
+        """ Return the indices of players who can add claims.
+        """
+        return [index for index, player in index_to_player.items()
+                if not self.is_player_full_results(player)]
+
+    def candidate_claims(self, index_to_player, from_index, to_index):
+        """ Return the ids of results which **from_index** player may claim 
+        about **to_index** player. Clear illogical statements are avoided.
+
+        :return: ``list`` of the ids of results.
+        """
+        from_player = index_to_player[from_index]
+        black = from_player.result.count(BLACK_CODE)
+        white = from_player.result.count(WHITE_CODE)
+
+        if self.wolf_number == black:
+            return [WhiteResult.get_id()]
+
+        if self.villager_number + self.lunatic_number == white:
+            return [BlackResult.get_id()]
+
+        return [WhiteResult.get_id(), BlackResult.get_id()]
+
     def choose_add_pair_randomly(self, index_to_player):
         """ Choose the pair of players randomly at adding claims.  
         """
-        from_target_indices = [index for index, player in index_to_player.items()
-                               if not self.is_player_full_results(player)]
-        from_index = random.choice(from_target_indices)
+        from_target_indices = self.candidate_from_indices(index_to_player)
+        from_index = self.random.choice(from_target_indices)
         from_player = index_to_player[from_index]
 
         current_indices = from_player.result.keys()
         to_target = [index for index in index_to_player.keys()
                      if index not in current_indices]
-        to_index = random.choice(to_target)
+        to_index = self.random.choice(to_target)
         return from_index, to_index
 
     def delete_claim(self, index_to_player):
@@ -140,39 +396,30 @@ class Strategy(object):
         """
         from_target_indices = [index for index, player in index_to_player.items()
                                if self.is_player_has_claims(player)]
-        from_index = random.choice(from_target_indices)
+        from_index = self.random.choice(from_target_indices)
         result_indices = list(index_to_player[from_index].result.keys())
         to_target = [index for index in result_indices if from_index != index]
-        to_index = random.choice(to_target)
+        to_index = self.random.choice(to_target)
         return from_index, to_index
 
     def choose_claim_randomly(self, index_to_player, from_index, to_index):
         """ Choose the result claims stated by ***from_index** player.  
-        Simply speaking, the result is selected randomly, however,clear illogical
-        statements are avoided.
+        Simply speaking, the result is selected randomly among :func:`candidate_claims`.
 
         :return: the id of result. 
         """
-        from_player = index_to_player[from_index]
-        black = len([key for key, value in
-                     from_player.result.items() if value == BlackResult.get_id()])
-
-        white = len([key for key, value in
-                     from_player.result.items() if value == WhiteResult.get_id()])
-
-        if self.wolf_number == black:
-            return WhiteResult.get_id()
-
-        if self.villager_number + self.lunatic_number == white:
-            return BlackResult.get_id()
-
-        if random.random() <= 1 / 2:
-            return WhiteResult.get_id()
+        claim_ids = self.candidate_claims(index_to_player, from_index, to_index)
+        if len(claim_ids) == 1:
+            return claim_ids[0]
+        if self.random.random() <= 1 / 2:
+            return claim_ids[0]
         else:
-            return BlackResult.get_id()
+            return claim_ids[1]
 
-    def generate_problem(self, index_to_player, max_iteration):
+    def generate_problem(self, index_to_player, max_iteration, observer=None):
         """ Generate the problem.
+        :param observer: :class:`observer.GenerationObserver`, which receives 
+                         the event of every iteration. If ``None``, nothing is measured.
         :return: ``dict``, which represents answer.
         :func:`get_answer_line` must assure that 
         the return of this function convert to the appropriate string.
@@ -181,18 +428,186 @@ class Strategy(object):
 
         """
 
+        candidates = self.create_candidate_store(index_to_player)
+        self._candidate_store = candidates
         for iter_number in range(max_iteration):
-            coherent_list = self.get_coherent_cases(index_to_player)
-
-            if len(coherent_list) == 0:
+            if observer is not None:
+                start = time.perf_counter()
+            candidates.sync(index_to_player)
+            coherent_number = candidates.count(UNIQUENESS_LIMIT)
+            if observer is not None:
+                coherence_time = time.perf_counter() - start
+                before = _snapshot_claims(index_to_player)
+
+            if coherent_number == 0:
+                action = "delete"
                 index_to_player = self.delete_claim(index_to_player)
-            elif len(coherent_list) > 1:
+            elif coherent_number > 1:
+                action = "add"
                 index_to_player = self.add_claim(index_to_player)
-            elif len(coherent_list) == 1:
-                answer = coherent_list[0]
+            elif coherent_number == 1:
+                action = "found"
+                answer = candidates.get_coherent_cases(1)[0]
+
+            if observer is not None:
+                selection_time = time.perf_counter() - start - coherence_time
+                claims = _diff_claims(before, _snapshot_claims(index_to_player))
+                observer.on_iteration(IterationEvent(iter_number, coherent_number, action,
+                                                     claims, coherence_time, selection_time))
+            if action == "found":
+                if observer is not None:
+                    observer.on_finish(True)
                 return answer
+        if observer is not None:
+            observer.on_finish(False)
         raise RuntimeError("Cannot generate the problem.")
 
+    def minimize_claims(self, index_to_player):
+        """ Remove the claims which are not needed for the unique answer, one at a time.
+
+        Removing a claim keeps the unique assignment coherent, so any other assignment
+        which comes back must contradict the removed claim.
+        Hence, only the assignments where the claimer is a villager and the claim is wrong
+        are searched by :func:`solver.RoleSolver.count_contradicting`,
+        while the masks of the claims are updated in place.
+        Since removing claims never makes the answer unique again,
+        one pass gives a minimal set of claims.
+
+        If :func:`is_result_coherent` is overridden,
+        the coherent cases are recounted at every removal instead.
+
+        :return: ``list`` of the removed claims, ``(from_index, to_index, result_id)``.
+        """
+        candidates = self.create_candidate_store(index_to_player)
+        candidates.sync(index_to_player)
+        if candidates.count(UNIQUENESS_LIMIT) != 1:
+            raise ValueError("The answer is not unique.")
+        if not self._uses_bitmask_engine():
+            return self._minimize_claims_by_store(index_to_player, candidates)
+
+        claim_masks = ClaimMasks.from_players(index_to_player)
+        white_masks = claim_masks.white_masks
+        black_masks = claim_masks.black_masks
+        removed = list()
+        for from_index in sorted(index_to_player.keys()):
+            result = index_to_player[from_index].result
+            for to_index, code in list(result.iter_codes()):
+                if to_index == from_index:
+                    continue
+                white_mask = white_masks[from_index]
+                black_mask = black_masks[from_index]
+                white_masks[from_index] &= ~(1 << to_index)
+                black_masks[from_index] &= ~(1 << to_index)
+                role_solver = RoleSolver(ClaimMasks(white_masks, black_masks),
+                                         self.villager_number, self.wolf_number,
+                                         self.lunatic_number)
+                if role_solver.count_contradicting(from_index, to_index, code, 1) == 0:
+                    del result[to_index]
+                    removed.append((from_index, to_index, code_to_id(code)))
+                else:
+                    white_masks[from_index] = white_mask
+                    black_masks[from_index] = black_mask
+        return removed
+
+    def _minimize_claims_by_store(self, index_to_player, candidates):
+        """ :func:`minimize_claims`, recounting the coherent cases at every removal.
+        """
+        removed = list()
+        for from_index in sorted(index_to_player.keys()):
+            result = index_to_player[from_index].result
+            for to_index, code in list(result.iter_codes()):
+                if to_index == from_index:
+                    continue
+                del result[to_index]
+                candidates.sync(index_to_player)
+                if candidates.count(UNIQUENESS_LIMIT) == 1:
+                    removed.append((from_index, to_index, code_to_id(code)))
+                else:
+                    result[to_index] = code
+                    candidates.sync(index_to_player)
+        return removed
+
+    def warm_start_order(self, index_to_player, villager_mask, wolf_mask):
+        """ Return the order of the players of a converged problem, in which this strategy
+        continues the problem, as ``list``: the ``k``-th player is the ``order[k]``-th one.
+        If this strategy cannot continue the problem, ``None`` is returned.
+
+        :param villager_mask: the villagers of the unique assignment of the problem.
+        :param wolf_mask: the wolves of the unique assignment of the problem.
+        """
+        order = list(index_to_player.keys())
+        self.random.shuffle(order)
+        return order
+
+    def mutate_claims(self, index_to_player, mutation_number=MUTATION_NUMBER, villager_mask=0):
+        """ Flip or move ``mutation_number`` claims at random.
+        A flipped claim is replaced by another one of :func:`candidate_claims`,
+        and a moved claim is deleted by :func:`delete_claim` and added by :func:`add_claim`.
+
+        :param villager_mask: the villagers of the unique assignment before the mutation.
+                              Their claims are not flipped, so the assignment stays coherent.
+        :return: ``index_to_player``, whose claims are mutated.
+        """
+        for _ in range(mutation_number):
+            claims = [(from_index, to_index) for from_index, player in index_to_player.items()
+                      if not (villager_mask >> from_index) & 1
+                      for to_index in player.result if to_index != from_index]
+            if claims and self.random.random() < 1 / 2:
+                from_index, to_index = self.random.choice(claims)
+                result = index_to_player[from_index].result
+                claim_id = result[to_index]
+                del result[to_index]
+                claim_ids = [candidate for candidate
+                             in self.candidate_claims(index_to_player, from_index, to_index)
+                             if candidate != claim_id]
+                result[to_index] = self.random.choice(claim_ids) if claim_ids else claim_id
+                continue
+            if claims:
+                index_to_player = self.delete_claim(index_to_player)
+            if self.candidate_from_indices(index_to_player):
+                index_to_player = self.add_claim(index_to_player)
+        return index_to_player
+
+    def create_candidate_store(self, index_to_player):
+        """ Return the store of coherent cases, which :func:`generate_problem` 
+        keeps updated by calling ``sync`` after every change of claims.
+
+        Every store has the following interface:
+
+        * ``total``: the number of players.
+        * ``sync(index_to_player)``: apply the current claims.
+        * ``count(limit=None)``: the number of coherent cases, which is at most ``limit``.
+        * ``get_coherent_cases(limit=None)``: ``list`` of ``dict`` with ``"wolf_indices"``.
+        * ``sample_assignments(limit)``: ``list`` of ``(villager_mask, wolf_mask)``,
+          or ``None`` if the cases are not represented by masks.
+
+        If :func:`is_result_coherent` is overridden, 
+        the coherent cases are recounted by :func:`count_coherent_cases` at every ``count``.
+        Otherwise, :class:`bitset.BitsetCandidates` is used if :func:`uses_bitset`, 
+        and :class:`solver.SolverCandidates` is used for the larger configurations.
+        """
+        if not self._uses_bitmask_engine():
+            return _RecomputedCandidates(self, len(index_to_player))
+        if uses_bitset(self.villager_number, self.wolf_number, self.lunatic_number):
+            return BitsetCandidates(len(index_to_player),
+                                    self.villager_number,
+                                    self.wolf_number,
+                                    self.lunatic_number)
+        candidates = SolverCandidates(len(index_to_player),
+                                      self.villager_number,
+                                      self.wolf_number,
+                                      self.lunatic_number)
+        if self.planted_assignment() is not None:
+            return _PlantedCandidates(self, candidates)
+        return candidates
+
+    def reset_candidates(self):
+        """ Discard the store of coherent cases kept by :func:`generate_problem`.
+        It must be called when the players are relabelled, 
+        since the store is synchronized with the previous indices.
+        """
+        self._candidate_store = None
+
     def get_answer_line(self, answer, lang="en"):
         """ Return the answer line.  
         """
@@ -222,14 +637,14 @@ class HalfForseener(Strategy):
         respectively. 
     """
 
-    def __init__(self, villager_number, wolf_number, lunatic_number):
+    def __init__(self, villager_number, wolf_number, lunatic_number, rng=None):
         def _half_number(number):
             number = number / 2
-            if random.random() < 1 / 2:
+            if self.random.random() < 1 / 2:
                 return math.floor(number)
             return math.ceil(number)
 
-        super().__init__(villager_number, wolf_number, lunatic_number)
+        super().__init__(villager_number, wolf_number, lunatic_number, rng)
         villager_forseener_number = _half_number(villager_number)
         wolf_forseener_number = _half_number(wolf_number)
         lunatic_forseener_number = _half_number(lunatic_number)
@@ -247,47 +662,41 @@ class HalfForseener(Strategy):
         self.wolf_forseener_indices = p_list[1]
         self.lunatic_forseener_indices = p_list[2]
         self.wolf_non_forseener_indices = p_list[3]
-
-    def add_claim(self, index_to_player):
-        """ Add the one claim so that the possible cases should be restricted. 
-
-        :return: ``index_to_player``, into which one claim is added. 
+        # The others do not claim, so any of them can be the remaining villagers.
+        self.villager_non_forseener_indices = \
+            list(range(total_number, total_number + villager_number - villager_forseener_number))
+
+    def planted_assignment(self):
+        villager_indices = self.villager_forseener_indices + self.villager_non_forseener_indices
+        wolf_indices = self.wolf_forseener_indices + self.wolf_non_forseener_indices
+        return villager_indices, wolf_indices
+
+    def warm_start_order(self, index_to_player, villager_mask, wolf_mask):
+        # The partition of forseeners is drawn at random for every strategy,
+        # so the claimers of another problem do not fit it in general.
+        return None
+
+    def candidate_from_indices(self, index_to_player):
+        """ Only forseeners claim.
         """
         def _is_forseener_target(index):
             return (index in self.villager_forseener_indices) or  \
                    (index in self.wolf_forseener_indices) or \
                    (index in self.lunatic_forseener_indices)
-        from_target_indices = [index for index, person in index_to_player.items()
-                               if not self.is_player_full_results(person)]
-
-        from_target_indices = [index for index in from_target_indices
-                               if _is_forseener_target(index)]
-
-        if not from_target_indices:
-            return self.delete_claim(index_to_player)
-
-        from_index = random.choice(from_target_indices)
-        from_person = index_to_player[from_index]
-
-        current_indices = from_person.result.keys()
-        to_target = [index for index in index_to_player.keys()
-                     if index not in current_indices]
-        to_index = random.choice(to_target)
+        from_target_indices = super().candidate_from_indices(index_to_player)
+        return [index for index in from_target_indices
+                if _is_forseener_target(index)]
 
+    def candidate_claims(self, index_to_player, from_index, to_index):
         # For assumed villager_forseener, claims must be right.
         if from_index in self.villager_forseener_indices:
             if to_index in self.wolf_forseener_indices:
-                from_person.result[to_index] = BlackResult.get_id()
+                return [BlackResult.get_id()]
             elif to_index in self.wolf_non_forseener_indices:
-                from_person.result[to_index] = BlackResult.get_id()
-            else:
-                from_person.result[to_index] = WhiteResult.get_id()
-        else:
-            if 0 <= random.random() <= 1 / 2:
-                from_person.result[to_index] = WhiteResult.get_id()
+                return [BlackResult.get_id()]
             else:
-                from_person.result[to_index] = BlackResult.get_id()
-        return index_to_player
+                return [WhiteResult.get_id()]
+        return [WhiteResult.get_id(), BlackResult.get_id()]
 
 
 class MasterWolvesStrategy(Strategy):
@@ -295,14 +704,20 @@ class MasterWolvesStrategy(Strategy):
     Assure that all wolves' claims are right except oneself. 
     """
 
-    def __init__(self, villager_number, wolf_number, lunatic_number):
-        super().__init__(villager_number, wolf_number, lunatic_number)
+    def __init__(self, villager_number, wolf_number, lunatic_number, rng=None):
+        super().__init__(villager_number, wolf_number, lunatic_number, rng)
         self.wolf_indices = range(wolf_number)
         self.villager_indices = range(
             wolf_number, wolf_number + villager_number)
 
-    def add_claim(self, index_to_player):
-        from_index, to_index = self.choose_add_pair_randomly(index_to_player)
+    def planted_assignment(self):
+        return list(self.villager_indices), list(self.wolf_indices)
+
+    def warm_start_order(self, index_to_player, villager_mask, wolf_mask):
+        return _planted_order(self.random, len(index_to_player), self.villager_indices,
+                              self.wolf_indices, villager_mask, wolf_mask)
+
+    def candidate_claims(self, index_to_player, from_index, to_index):
         from_player = index_to_player[from_index]
 
         if from_index in self.wolf_indices or from_index in self.villager_indices:
@@ -312,8 +727,7 @@ class MasterWolvesStrategy(Strategy):
                 claim_id = WhiteResult.get_id()
         else:
             # Strategy of lunatics.
-            black = len([key for key, value in
-                         from_player.result.items() if value == BlackResult.get_id()])
+            black = from_player.result.count(BLACK_CODE)
 
             if black == self.wolf_number:
                 claim_id = WhiteResult.get_id()
@@ -323,8 +737,7 @@ class MasterWolvesStrategy(Strategy):
                 else:
                     claim_id = BlackResult.get_id()
 
-        from_player.result[to_index] = claim_id
-        return index_to_player
+        return [claim_id]
 
 
 class OneMasterWolfStrategy(Strategy):
@@ -333,19 +746,35 @@ class OneMasterWolfStrategy(Strategy):
     except himself. 
     """
 
-    def __init__(self, villager_number, wolf_number, lunatic_number):
-        super().__init__(villager_number, wolf_number, lunatic_number)
+    def __init__(self, villager_number, wolf_number, lunatic_number, rng=None):
+        super().__init__(villager_number, wolf_number, lunatic_number, rng)
         self.master_wolf_index = 0
         self.wolf_indices = range(wolf_number)
         self.villager_indices = range(
             wolf_number, wolf_number + villager_number)
 
-    def add_claim(self, index_to_player):
-        """ Add the one claim so that the possible cases should be restricted. 
+    def planted_assignment(self):
+        return list(self.villager_indices), list(self.wolf_indices)
 
-        :return: ``index_to_player``, into which one claim is added. 
+    def warm_start_order(self, index_to_player, villager_mask, wolf_mask):
+        """ The wolf whose claims are all right becomes the master wolf.
         """
-        from_index, to_index = self.choose_add_pair_randomly(index_to_player)
+        order = _planted_order(self.random, len(index_to_player), self.villager_indices,
+                               self.wolf_indices, villager_mask, wolf_mask)
+        masters = list()
+        for position in self.wolf_indices:
+            index = order[position]
+            white, black = index_to_player[index].result.masks()
+            if not (white & ~(1 << index) & wolf_mask or black & ~wolf_mask):
+                masters.append(position)
+        if not masters:
+            return None
+        master_position = self.random.choice(masters)
+        order[self.master_wolf_index], order[master_position] = \
+            order[master_position], order[self.master_wolf_index]
+        return order
+
+    def candidate_claims(self, index_to_player, from_index, to_index):
         from_player = index_to_player[from_index]
 
         if from_index == self.master_wolf_index or from_index in self.villager_indices:
@@ -355,8 +784,7 @@ class OneMasterWolfStrategy(Strategy):
                 claim_id = WhiteResult.get_id()
         else:
             # Strategy of lunatics.
-            black = len([key for key, value in
-                         from_player.result.items() if value == BlackResult.get_id()])
+            black = from_player.result.count(BLACK_CODE)
 
             if black == self.wolf_number:
                 claim_id = WhiteResult.get_id()
@@ -366,11 +794,106 @@ class OneMasterWolfStrategy(Strategy):
                 else:
                     claim_id = BlackResult.get_id()
 
-        from_player.result[to_index] = claim_id
-        return index_to_player
+        return [claim_id]
+
+
+class _RecomputedCandidates(object):
+    """ Coherent cases recounted from scratch at every ``count``.
+    This has the interface of the stores of :func:`Strategy.create_candidate_store`.
+    """
+
+    def __init__(self, strategy, total):
+        self.strategy = strategy
+        self.total = total
+        self.index_to_player = dict()
+
+    def sync(self, index_to_player):
+        self.index_to_player = index_to_player
+
+    def count(self, limit=None):
+        return self.strategy.count_coherent_cases(self.index_to_player, limit)
+
+    def get_coherent_cases(self, limit=None):
+        return list(islice(self.strategy.iter_coherent_cases(self.index_to_player), limit))
+
+    def sample_assignments(self, limit):
+        # The cases of overridden :func:`is_result_coherent` are not represented by masks.
+        return None
+
+
+class _PlantedCandidates(object):
+    """ Coherent cases of another store, whose uniqueness is checked
+    around :func:`Strategy.planted_assignment` before the store searches.
+    This has the interface of the stores of :func:`Strategy.create_candidate_store`.
+    """
+
+    def __init__(self, strategy, candidates):
+        self.strategy = strategy
+        self.candidates = candidates
+        self.total = candidates.total
+        self.claim_masks = None
+
+    def sync(self, index_to_player):
+        self.candidates.sync(index_to_player)
+        self.claim_masks = ClaimMasks.from_players(index_to_player)
+
+    def count(self, limit=None):
+        number = self.strategy._count_around_planted(self.claim_masks, limit)
+        if number is None:
+            return self.candidates.count(limit)
+        return number
+
+    def iter_coherent_cases(self):
+        return self.candidates.iter_coherent_cases()
+
+    def get_coherent_cases(self, limit=None):
+        return self.candidates.get_coherent_cases(limit)
+
+    def sample_assignments(self, limit):
+        return self.candidates.sample_assignments(limit)
 
 
 # Utility functions.
+def _snapshot_claims(index_to_player):
+    return {index: bytes(player.result.row) for index, player in index_to_player.items()}
+
+
+def _diff_claims(before, after):
+    """ Return the changed claims between two snapshots,
+    as ``(from_index, to_index, result_id)``, where ``result_id`` is ``None`` if deleted.
+    """
+    claims = list()
+    for from_index, row in after.items():
+        previous = before.get(from_index, b"")
+        for to_index in range(max(len(row), len(previous))):
+            code = row[to_index] if to_index < len(row) else UNKNOWN_CODE
+            previous_code = previous[to_index] if to_index < len(previous) else UNKNOWN_CODE
+            if code != previous_code:
+                result_id = None if code == UNKNOWN_CODE else code_to_id(code)
+                claims.append((from_index, to_index, result_id))
+    return claims
+
+
+def _planted_order(rng, total, villager_indices, wolf_indices, villager_mask, wolf_mask):
+    """ Return the order of players, which puts the villagers and the wolves of the masks
+    at ``villager_indices`` and ``wolf_indices`` at random, and the lunatics at the rest.
+
+    :param rng: ``random.Random``.
+    """
+    lunatic_indices = [index for index in range(total)
+                       if index not in villager_indices and index not in wolf_indices]
+    order = [None] * total
+    for positions, mask in ((villager_indices, villager_mask),
+                            (wolf_indices, wolf_mask),
+                            (lunatic_indices, ((1 << total) - 1) & ~villager_mask & ~wolf_mask)):
+        indices = mask_to_indices(mask)
+        assert len(indices) == len(positions)
+        rng.shuffle(indices)
+        for position, index in zip(positions, indices):
+            order[position] = index
+    return order
+
+
 def _multiple_combination(sequence, number_list):
     assert sum(number_list) <= len(sequence)
     sequence = tuple(sequence)
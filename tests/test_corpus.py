@@ -0,0 +1,61 @@
+""" The round trip of the generated puzzles through the binary corpus.
+
+```
+python -m unittest discover -s tests -t .
+```
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import corpus
+from export import CorpusFormatter, MarkdownFormatter
+from puzzle_generator import generate_many
+
+
+class CorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "puzzles.wwpz")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        generators = generate_many(4, 2, 1, 10, strategy_mode="master_wolves", jobs=1)
+        with open(self.path, "wb") as fp:
+            self.assertEqual(CorpusFormatter().write(generators, fp), len(generators))
+        # A partially written record at the end is ignored.
+        with open(self.path, "ab") as fp:
+            fp.write(b"\0")
+
+        with corpus.Corpus(self.path) as puzzles:
+            self.assertEqual(len(puzzles), len(generators))
+            self.assertEqual((puzzles.villager_number, puzzles.wolf_number,
+                              puzzles.lunatic_number, puzzles.strategy_mode),
+                             (4, 2, 1, "master_wolves"))
+            for index, generator in enumerate(generators):
+                self.assertEqual(puzzles.render(index), MarkdownFormatter().format(generator))
+                record = puzzles[index]
+                claim_matrix, wolf_indices = corpus.unpack_record(record, puzzles.total)
+                record.release()
+                self.assertEqual(claim_matrix.rows, generator.claim_matrix.rows)
+                self.assertEqual(wolf_indices, sorted(generator.answer["wolf_indices"]))
+            with self.assertRaises(IndexError):
+                puzzles[len(generators)]
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as fp:
+            pass
+        with self.assertRaises(ValueError):
+            corpus.Corpus(self.path)
+        with open(self.path, "wb") as fp:
+            fp.write(b"XXXX" + bytes(corpus.HEADER_SIZE))
+        with self.assertRaises(ValueError):
+            corpus.Corpus(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
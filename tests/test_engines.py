@@ -0,0 +1,263 @@
+""" The coherence engines against the brute force over all the assignments of roles.
+
+```
+python -m unittest discover -s tests -t .
+```
+"""
+import random
+import unittest
+from itertools import product
+
+from result import WHITE_CODE, BLACK_CODE
+from player import ClaimMatrix
+from coherence import (ClaimMasks, count_coherent_assignments, find_swapped_assignment,
+                       iter_assignment_masks)
+from bitset import BitsetCandidates
+from solver import RoleSolver
+from canonical import canonical_key
+import ranking
+import vectorized
+import strategy
+
+# The number of random claim sets of every test.
+TRIAL_NUMBER = 200
+
+VILLAGER, WOLF, LUNATIC = range(3)
+
+
+def random_numbers(rng):
+    """ Return the random numbers of roles of a small table.
+    """
+    return rng.randint(1, 5), rng.randint(1, 3), rng.randint(0, 2)
+
+
+def random_claim_matrix(rng, total):
+    """ Return :class:`player.ClaimMatrix` with random claims.
+    """
+    claim_matrix = ClaimMatrix(total)
+    for _ in range(rng.randint(0, 2 * total)):
+        from_index, to_index = rng.sample(range(total), 2)
+        claim_matrix.rows[from_index][to_index] = rng.choice((WHITE_CODE, BLACK_CODE))
+    return claim_matrix
+
+
+def brute_force(claim_matrix, villager_number, wolf_number, lunatic_number):
+    """ Return the set of the coherent assignments as ``(villager_mask, wolf_mask)``,
+    trying every role of every player.
+    """
+    total = len(claim_matrix)
+    assignments = set()
+    for roles in product((VILLAGER, WOLF, LUNATIC), repeat=total):
+        if (roles.count(VILLAGER), roles.count(WOLF), roles.count(LUNATIC)) != \
+                (villager_number, wolf_number, lunatic_number):
+            continue
+        if all(roles[from_index] != VILLAGER or
+               (code == WHITE_CODE) == (roles[to_index] != WOLF)
+               for from_index, row in enumerate(claim_matrix.rows)
+               for to_index, code in enumerate(row)
+               if code and from_index != to_index):
+            villager_mask = sum(1 << index for index, role in enumerate(roles) if role == VILLAGER)
+            wolf_mask = sum(1 << index for index, role in enumerate(roles) if role == WOLF)
+            assignments.add((villager_mask, wolf_mask))
+    return assignments
+
+
+def iter_cases(seed):
+    """ Yield ``(rng, numbers, claim_matrix, coherent_assignments)`` of random tables.
+    """
+    rng = random.Random(seed)
+    for _ in range(TRIAL_NUMBER):
+        numbers = random_numbers(rng)
+        claim_matrix = random_claim_matrix(rng, sum(numbers))
+        yield rng, numbers, claim_matrix, brute_force(claim_matrix, *numbers)
+
+
+def swapped_assignments(assignment, total):
+    """ Yield the assignments, where the roles of two players of ``assignment`` are swapped.
+    """
+    villager_mask, wolf_mask = assignment
+    roles = [VILLAGER if (villager_mask >> index) & 1 else
+             WOLF if (wolf_mask >> index) & 1 else LUNATIC for index in range(total)]
+    for first in range(total):
+        for second in range(first + 1, total):
+            if roles[first] == roles[second]:
+                continue
+            swapped = list(roles)
+            swapped[first], swapped[second] = swapped[second], swapped[first]
+            yield (sum(1 << index for index, role in enumerate(swapped) if role == VILLAGER),
+                   sum(1 << index for index, role in enumerate(swapped) if role == WOLF))
+
+
+class EngineTest(unittest.TestCase):
+
+    def test_count_coherent_assignments(self):
+        for _, numbers, claim_matrix, expected in iter_cases(0):
+            claim_masks = ClaimMasks.from_players(claim_matrix.create_players())
+            self.assertEqual(count_coherent_assignments(claim_masks, *numbers), len(expected))
+            self.assertEqual(count_coherent_assignments(claim_masks, *numbers, limit=2),
+                             min(len(expected), 2))
+
+    def test_role_solver(self):
+        for _, numbers, claim_matrix, expected in iter_cases(1):
+            role_solver = RoleSolver.from_players(claim_matrix.create_players(), *numbers)
+            solutions = list(role_solver.iter_solutions())
+            self.assertEqual(len(solutions), len(set(solutions)))
+            self.assertEqual(set(solutions), expected)
+            self.assertEqual(role_solver.count(), len(expected))
+            self.assertEqual(role_solver.count(2), min(len(expected), 2))
+
+    def test_bitset_candidates(self):
+        for rng, numbers, claim_matrix, expected in iter_cases(2):
+            total = sum(numbers)
+            candidates = BitsetCandidates(total, *numbers)
+            candidates.sync(claim_matrix.create_players())
+            self.assertEqual(set(candidates.iter_assignments()), expected)
+            self.assertEqual(candidates.count(), len(expected))
+
+            # The incremental changes agree with the brute force of the changed claims.
+            claims = list(candidates.claims)
+            for from_index, to_index in rng.sample(claims, min(len(claims), 2)):
+                candidates.delete_claim(from_index, to_index)
+                claim_matrix.rows[from_index][to_index] = 0
+            from_index, to_index = rng.sample(range(total), 2)
+            code = rng.choice((WHITE_CODE, BLACK_CODE))
+            candidates.add_claim(from_index, to_index, code)
+            claim_matrix.rows[from_index][to_index] = code
+            self.assertEqual(set(candidates.iter_assignments()),
+                             brute_force(claim_matrix, *numbers))
+            # Every rejected assignment is in exactly one bucket.
+            bits = candidates.coherent_bits
+            for blocked_bits in candidates.blocked_bits.values():
+                self.assertFalse(bits & blocked_bits)
+                bits |= blocked_bits
+            self.assertEqual(bits, candidates.bitsets.all_bits)
+
+    def test_find_swapped_assignment(self):
+        for rng, numbers, claim_matrix, expected in iter_cases(3):
+            if not expected:
+                continue
+            total = sum(numbers)
+            assignment = rng.choice(sorted(expected))
+            claim_masks = ClaimMasks.from_players(claim_matrix.create_players())
+            neighbours = set(swapped_assignments(assignment, total)) & expected
+            swapped = find_swapped_assignment(claim_masks, *assignment)
+            if neighbours:
+                self.assertIn(swapped, neighbours)
+            else:
+                self.assertIsNone(swapped)
+
+    def test_count_contradicting(self):
+        for rng, numbers, claim_matrix, _ in iter_cases(5):
+            claims = [(from_index, to_index, code)
+                      for from_index, row in enumerate(claim_matrix.rows)
+                      for to_index, code in enumerate(row) if code and from_index != to_index]
+            if not claims:
+                continue
+            from_index, to_index, code = rng.choice(claims)
+            claim_matrix.rows[from_index][to_index] = 0
+            expected = [(villager_mask, wolf_mask)
+                        for villager_mask, wolf_mask in brute_force(claim_matrix, *numbers)
+                        if (villager_mask >> from_index) & 1 and
+                        ((wolf_mask >> to_index) & 1) == (code == WHITE_CODE)]
+            role_solver = RoleSolver.from_players(claim_matrix.create_players(), *numbers)
+            self.assertEqual(role_solver.count_contradicting(from_index, to_index, code),
+                             len(expected))
+
+    def test_minimize_claims(self):
+        rng = random.Random(6)
+        for mode in (None, "master_wolves"):
+            for _ in range(20):
+                numbers = random_numbers(rng)
+                puzzle = strategy.choose_strategy(mode)(*numbers, random.Random(rng.random()))
+                index_to_player = ClaimMatrix(sum(numbers)).create_players()
+                try:
+                    puzzle.generate_problem(index_to_player, 100)
+                except RuntimeError:
+                    continue
+                puzzle.minimize_claims(index_to_player)
+                claim_matrix = ClaimMatrix(0)
+                claim_matrix.rows = [player.result.row for player in index_to_player.values()]
+                self.assertEqual(len(brute_force(claim_matrix, *numbers)), 1)
+                # Every remaining claim is needed for the uniqueness.
+                for from_index, row in enumerate(claim_matrix.rows):
+                    for to_index, code in enumerate(row):
+                        if code and from_index != to_index:
+                            row[to_index] = 0
+                            self.assertGreater(len(brute_force(claim_matrix, *numbers)), 1)
+                            row[to_index] = code
+
+    def test_bitset_player_limit(self):
+        # 64/1/1 and 66/1/0 have few assignments, but the table masks are 64-bit.
+        self.assertTrue(strategy.uses_bitset(62, 1, 1))
+        self.assertFalse(strategy.uses_bitset(64, 1, 1))
+        self.assertFalse(strategy.uses_bitset(66, 1, 0))
+
+
+@unittest.skipUnless(vectorized.is_available(), "NumPy is not installed.")
+class VectorizedTest(unittest.TestCase):
+
+    def test_coherent_assignments(self):
+        for _, numbers, claim_matrix, expected in iter_cases(9):
+            claim_masks = ClaimMasks.from_players(claim_matrix.create_players())
+            assignments = list(vectorized.iter_coherent_assignments(claim_masks, *numbers))
+            self.assertEqual(len(assignments), len(set(assignments)))
+            self.assertEqual(set(assignments), expected)
+            self.assertEqual(vectorized.count_coherent_assignments(claim_masks, *numbers),
+                             len(expected))
+
+    def test_player_limit(self):
+        self.assertTrue(vectorized.is_applicable(62, 1, 1))
+        self.assertFalse(vectorized.is_applicable(64, 1, 1))
+
+
+class RankingTest(unittest.TestCase):
+
+    def test_bijection(self):
+        rng = random.Random(7)
+        for _ in range(TRIAL_NUMBER // 10):
+            numbers = random_numbers(rng)
+            assignments = list(iter_assignment_masks(sum(numbers), *numbers))
+            for rank, assignment in enumerate(assignments):
+                self.assertEqual(ranking.unrank_assignment(*numbers, rank), assignment)
+                self.assertEqual(ranking.rank_assignment(*numbers, *assignment), rank)
+            with self.assertRaises(ValueError):
+                ranking.unrank_assignment(*numbers, len(assignments))
+
+            start, stop = sorted(rng.sample(range(len(assignments) + 2), 2))
+            self.assertEqual(list(ranking.iter_assignment_range(*numbers, start, stop)),
+                             assignments[start:stop])
+
+    def test_count_coherent_sharded(self):
+        for _, numbers, claim_matrix, expected in iter_cases(8):
+            claim_masks = ClaimMasks.from_players(claim_matrix.create_players())
+            self.assertEqual(ranking.count_coherent_sharded(claim_masks, *numbers, jobs=1,
+                                                            shards=3), len(expected))
+            self.assertEqual(ranking.count_coherent_sharded(claim_masks, *numbers, limit=2,
+                                                            jobs=1, shards=3),
+                             min(len(expected), 2))
+
+
+class CanonicalTest(unittest.TestCase):
+
+    def test_permutation_invariance(self):
+        rng = random.Random(4)
+        for _ in range(TRIAL_NUMBER):
+            numbers = random_numbers(rng)
+            total = sum(numbers)
+            claim_matrix = random_claim_matrix(rng, total)
+            order = list(range(total))
+            rng.shuffle(order)
+            self.assertEqual(canonical_key(claim_matrix.create_players(), *numbers),
+                             canonical_key(claim_matrix.permute(order).create_players(), *numbers))
+
+    def test_different_claims(self):
+        claim_matrix = ClaimMatrix(4)
+        claim_matrix.rows[0][1] = BLACK_CODE
+        other_matrix = ClaimMatrix(4)
+        other_matrix.rows[0][1] = WHITE_CODE
+        self.assertNotEqual(canonical_key(claim_matrix.create_players(), 2, 1, 1),
+                            canonical_key(other_matrix.create_players(), 2, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
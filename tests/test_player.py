@@ -0,0 +1,29 @@
+""" The claims of players stored in the rows of the claim matrix.
+
+```
+python -m unittest discover -s tests -t .
+```
+"""
+import unittest
+
+from result import WhiteResult, BlackResult
+from player import ClaimMatrix, Player
+
+
+class PlayerTest(unittest.TestCase):
+
+    def test_assign_own_result(self):
+        player = Player(0)
+        player.result[2] = BlackResult.get_id()
+        player.result = player.result
+        self.assertEqual(dict(player.result), {0: WhiteResult.get_id(), 2: BlackResult.get_id()})
+
+    def test_assign_dict(self):
+        index_to_player = ClaimMatrix(3).create_players()
+        index_to_player[1].result = {1: WhiteResult.get_id(), 0: BlackResult.get_id()}
+        self.assertEqual(list(index_to_player[1].result), [0, 1])
+        self.assertEqual(index_to_player[1].result.count(BlackResult.get_code()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
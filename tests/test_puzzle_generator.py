@@ -0,0 +1,54 @@
+""" Batch generation of puzzles.
+
+```
+python -m unittest discover -s tests -t .
+```
+"""
+import unittest
+
+import canonical
+from coherence import ClaimMasks
+from solver import RoleSolver
+from puzzle_generator import PuzzleGenereator, generate_many
+
+
+class WarmStartTest(unittest.TestCase):
+
+    def assert_unique(self, generator):
+        role_solver = RoleSolver(ClaimMasks.from_players(generator.index_to_player),
+                                 generator.villager_number, generator.wolf_number,
+                                 generator.lunatic_number)
+        self.assertEqual(role_solver.count(2), 1)
+
+    def test_greedy_warm(self):
+        # Greedy selection tends to repair the mutation, and converge back to the parent.
+        for strategy_mode in (None, "master_wolves", "master_wolf"):
+            generators = generate_many(4, 1, 2, 20, strategy_mode=strategy_mode, jobs=1,
+                                       selection="greedy", warm_start=True)
+            self.assertEqual(len(generators), 20)
+            for generator in generators:
+                self.assert_unique(generator)
+
+    def test_mutated_differs_from_parent(self):
+        # ``half_forseener`` cannot continue the parent, so the child is generated from scratch.
+        for strategy_mode in (None, "master_wolves", "half_forseener"):
+            parent = None
+            for seed in range(20):
+                generator = PuzzleGenereator(5, 2, 1, strategy_mode=strategy_mode, seed=seed,
+                                             selection="greedy")
+                try:
+                    if parent is None:
+                        generator.generate_problem(max_iteration=1000)
+                    else:
+                        generator.generate_mutated(parent, max_iteration=1000)
+                except RuntimeError:
+                    continue
+                self.assert_unique(generator)
+                if parent is not None:
+                    self.assertNotEqual(canonical.canonical_hash(generator),
+                                        canonical.canonical_hash(parent))
+                parent = generator
+
+
+if __name__ == "__main__":
+    unittest.main()
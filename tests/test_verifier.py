@@ -0,0 +1,44 @@
+""" The round trip of the generated puzzles through the markdown format.
+
+```
+python -m unittest discover -s tests -t .
+```
+"""
+import io
+import unittest
+
+import verifier
+from export import MarkdownFormatter
+from puzzle_generator import generate_many
+
+
+class VerifierTest(unittest.TestCase):
+
+    def assert_round_trip(self, numbers, lang):
+        generators = generate_many(*numbers, 10, lang=lang, jobs=1)
+        stream = io.StringIO()
+        MarkdownFormatter().write(generators, stream)
+        stream.seek(0)
+        records = list(verifier.iter_verify(stream, jobs=1))
+        self.assertEqual(len(records), len(generators))
+        for generator, record in zip(generators, records):
+            self.assertEqual(record["status"], "unique")
+            self.assertTrue(record["answer_matches"])
+            self.assertEqual(record["wolf_indices"], sorted(generator.answer["wolf_indices"]))
+
+    def test_round_trip_en(self):
+        self.assert_round_trip((4, 1, 2), "en")
+        self.assert_round_trip((5, 2, 0), "en")
+
+    def test_round_trip_jp(self):
+        self.assert_round_trip((4, 1, 2), "jp")
+        self.assert_round_trip((5, 2, 0), "jp")
+
+    def test_parse_error(self):
+        lines = ["## Problem", "A's claim:B○"]
+        record = verifier.verify_text(1, lines)
+        self.assertEqual(record["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
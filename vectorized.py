@@ -0,0 +1,125 @@
+""" NumPy backend of the coherence check over all the assignments at once.
+
+The assignments of :func:`coherence.assignment_table` are held as role matrices,
+whose rows are assignments and whose columns are players,
+and the claims are held as a matrix, whose rows are claimers.
+For a claimer ``i`` and an assignment, the number of the wrong claims is
+
+    (the wolves claimed white) + (the non-wolves claimed black)
+    = wolf @ (white - black)[i] + (the number of the players claimed black)[i],
+
+which is a single matrix product for all the assignments.
+The assignment is coherent if and only if no villager has a wrong claim.
+
+NumPy is optional. If it is not installed, :func:`is_available` returns ``False``
+and :mod:`strategy` keeps the pure-Python engines.
+"""
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from coherence import assignment_count, assignment_table, TABLE_PLAYER_LIMIT
+
+# The largest number of assignments which are evaluated by NumPy.
+# Above ``strategy.SOLVER_THRESHOLD``, NumPy still enumerates all the coherent cases faster
+# than the solver up to about this number, though the solver stops earlier at a limit.
+TABLE_LIMIT = 1 << 16
+
+# The number of assignments evaluated at once, which bounds the temporary memory.
+BLOCK_SIZE = 1 << 14
+
+ROLE_MATRIX_CACHE_SIZE = 4
+
+_role_matrices = OrderedDict()
+
+
+def is_available():
+    """ Return whether NumPy is installed or not.
+    """
+    return numpy is not None
+
+
+def is_applicable(villager_number, wolf_number, lunatic_number):
+    """ Return whether the configuration is evaluated by this backend or not.
+    """
+    total = villager_number + wolf_number + lunatic_number
+    return (is_available() and total <= TABLE_PLAYER_LIMIT and
+            assignment_count(villager_number, wolf_number, lunatic_number) <= TABLE_LIMIT)
+
+
+def role_matrices(villager_number, wolf_number, lunatic_number):
+    """ Return ``(villager_matrix, wolf_matrix)`` of the cached assignment table.
+    ``villager_matrix`` is ``bool`` and ``wolf_matrix`` is ``float32``,
+    and both have the shape ``(the number of assignments, the number of players)``.
+    """
+    key = (villager_number, wolf_number, lunatic_number)
+    matrices = _role_matrices.get(key)
+    if matrices is not None:
+        _role_matrices.move_to_end(key)
+        return matrices
+
+    total = sum(key)
+    table = assignment_table(*key)
+    masks = numpy.frombuffer(table.masks, dtype=numpy.uint64).reshape(-1, 2)
+    shifts = numpy.arange(total, dtype=numpy.uint64)
+    villager_matrix = ((masks[:, 0:1] >> shifts) & numpy.uint64(1)).astype(bool)
+    wolf_matrix = ((masks[:, 1:2] >> shifts) & numpy.uint64(1)).astype(numpy.float32)
+    matrices = (villager_matrix, wolf_matrix)
+    _role_matrices[key] = matrices
+    while len(_role_matrices) > ROLE_MATRIX_CACHE_SIZE:
+        _role_matrices.popitem(last=False)
+    return matrices
+
+
+def coherent_flags(claim_masks, villager_number, wolf_number, lunatic_number):
+    """ Evaluate all the assignments of :func:`coherence.assignment_table`.
+
+    :param claim_masks: :class:`coherence.ClaimMasks`.
+    :return: ``numpy.ndarray`` of ``bool``, whose element is ``True``
+             if the assignment of the same rank is coherent.
+    """
+    villager_matrix, wolf_matrix = role_matrices(villager_number, wolf_number, lunatic_number)
+    total = wolf_matrix.shape[1]
+    claimers = [index for index, _, _ in claim_masks.claimers]
+    flags = numpy.ones(len(wolf_matrix), dtype=bool)
+    if not claimers:
+        return flags
+
+    signs = numpy.zeros((total, len(claimers)), dtype=numpy.float32)
+    black_numbers = numpy.zeros(len(claimers), dtype=numpy.float32)
+    for column, (index, white, black) in enumerate(claim_masks.claimers):
+        for to_index in range(total):
+            if to_index == index:
+                continue
+            if (white >> to_index) & 1:
+                signs[to_index, column] += 1
+            if (black >> to_index) & 1:
+                signs[to_index, column] -= 1
+                black_numbers[column] += 1
+
+    for start in range(0, len(wolf_matrix), BLOCK_SIZE):
+        stop = start + BLOCK_SIZE
+        wrong = wolf_matrix[start:stop] @ signs + black_numbers
+        violated = (wrong > 0.5) & villager_matrix[start:stop, claimers]
+        flags[start:stop] = ~violated.any(axis=1)
+    return flags
+
+
+def iter_coherent_assignments(claim_masks, villager_number, wolf_number, lunatic_number):
+    """ Yield the coherent assignments as ``(villager_mask, wolf_mask)``,
+    in the order of :func:`coherence.iter_assignment_masks`.
+    """
+    table = assignment_table(villager_number, wolf_number, lunatic_number)
+    flags = coherent_flags(claim_masks, villager_number, wolf_number, lunatic_number)
+    for rank in numpy.flatnonzero(flags).tolist():
+        yield table[rank]
+
+
+def count_coherent_assignments(claim_masks, villager_number, wolf_number, lunatic_number):
+    """ Return the number of the coherent assignments.
+    """
+    flags = coherent_flags(claim_masks, villager_number, wolf_number, lunatic_number)
+    return int(numpy.count_nonzero(flags))
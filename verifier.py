@@ -0,0 +1,270 @@
+""" Parser and verifier of puzzles in the markdown format.
+
+The format is the one of :class:`export.MarkdownFormatter`, in English or Japanese.
+
+```
+## Problem
+Roles:Villager/Wolf/Lunatic=4/1/2, PL:A-G
+### Player's claims
+A's claim:B●,D○
+## Answer
+Wolves:B
+```
+
+Every puzzle is solved by :class:`solver.RoleSolver`, under the same rules
+as :func:`strategy.Strategy.is_result_coherent`, and the number of the solutions
+is reported as 0, 1, or 2 (which means 2 or more).
+
+```
+python verifier.py -input puzzles.md -jobs 4 > results.jsonl
+```
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+from result import WHITE_CODE, BLACK_CODE
+from coherence import ClaimMasks, mask_to_indices
+from solver import RoleSolver
+from parallel import iter_bounded_map
+
+# The number of solutions, up to which puzzles are solved.
+SOLUTION_LIMIT = 2
+
+_PROBLEM_PATTERN = re.compile(r"^## (Problem|問題)\s*$")
+_ANSWER_PATTERN = re.compile(r"^## (Answer|解答)\s*$")
+_ROLE_PATTERN = re.compile(r"^(?:Roles:Villager/Wolf|内訳:村陣営/狼)(/Lunatic|/狂)?"
+                           r"=(\d+)/(\d+)(?:/(\d+))?, PL:A-([A-Z]+)\s*$")
+_CLAIM_PATTERN = re.compile(r"^([A-Z]+)(?:'s claim|の主張):(.*)$")
+_RESULT_PATTERN = re.compile(r"^([A-Z]+)([○●])$")
+_WOLVES_PATTERN = re.compile(r"^(?:Wolves|狼):([A-Z,]*)\s*$")
+
+_RESULT_CODES = {"○": WHITE_CODE, "●": BLACK_CODE}
+
+
+class ParsedPuzzle(namedtuple("ParsedPuzzle",
+                              ["villager_number", "wolf_number", "lunatic_number",
+                               "claims", "wolf_indices", "line"])):
+    """ The puzzle read from the text.
+
+    :param claims: ``list`` of ``(from_index, to_index, code)``.
+    :param wolf_indices: the sorted indices of the stated answer, or ``None``.
+    :param line: the line number of the header of the puzzle, starting from 1.
+    """
+    __slots__ = ()
+
+
+def _alphabet_to_index(alphabet):
+    """ Convert the alphabet of :func:`strategy._index_to_alphabet` to the index.
+    """
+    index = 0
+    for letter in alphabet:
+        index = index * 26 + (ord(letter) - ord("A") + 1)
+    return index - 1
+
+
+def iter_puzzle_texts(lines):
+    """ Split the lines into the puzzles, lazily.
+
+    :return: iterator of ``(line_number, lines)``, where ``line_number`` is that of the header.
+    """
+    header = None
+    body = list()
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\n")
+        if _PROBLEM_PATTERN.match(line):
+            if header is not None:
+                yield header, body
+            header, body = line_number, list()
+        elif header is not None:
+            body.append(line)
+    if header is not None:
+        yield header, body
+
+
+def parse_puzzle(lines, line_number=1):
+    """ Parse the lines of one puzzle, following the header.
+
+    :return: :class:`ParsedPuzzle`.
+    :raise ValueError: if the text is malformed.
+    """
+    numbers = None
+    total = None
+    claims = list()
+    wolf_indices = None
+    in_answer = False
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("### "):
+            continue
+        if _ANSWER_PATTERN.match(line):
+            in_answer = True
+            continue
+        if in_answer:
+            match = _WOLVES_PATTERN.match(line)
+            if match is None:
+                raise ValueError("Invalid answer.", line)
+            alphabets = [alphabet for alphabet in match.group(1).split(",") if alphabet]
+            wolf_indices = sorted(_alphabet_to_index(alphabet) for alphabet in alphabets)
+            continue
+
+        match = _ROLE_PATTERN.match(line)
+        if match is not None:
+            has_lunatic, villager, wolf, lunatic, last = match.groups()
+            if bool(has_lunatic) != (lunatic is not None):
+                raise ValueError("Invalid roles.", line)
+            numbers = (int(villager), int(wolf), int(lunatic or 0))
+            total = _alphabet_to_index(last) + 1
+            if sum(numbers) != total:
+                raise ValueError("The numbers of roles do not match the players.", line)
+            continue
+
+        match = _CLAIM_PATTERN.match(line)
+        if match is None:
+            raise ValueError("Invalid line.", line)
+        if numbers is None:
+            raise ValueError("The roles are not given before the claims.", line)
+        from_index = _alphabet_to_index(match.group(1))
+        for item in match.group(2).split(","):
+            result_match = _RESULT_PATTERN.match(item.strip())
+            if result_match is None:
+                raise ValueError("Invalid claim.", line)
+            to_index = _alphabet_to_index(result_match.group(1))
+            if not (0 <= from_index < total and 0 <= to_index < total) \
+                    or from_index == to_index:
+                raise ValueError("Invalid player.", line)
+            claims.append((from_index, to_index, _RESULT_CODES[result_match.group(2)]))
+
+    if numbers is None:
+        raise ValueError("The roles are not given.")
+    if wolf_indices is not None and \
+            not all(0 <= index < total for index in wolf_indices):
+        raise ValueError("Invalid player in the answer.", wolf_indices)
+    return ParsedPuzzle(numbers[0], numbers[1], numbers[2], claims, wolf_indices, line_number)
+
+
+def solve(puzzle, limit=SOLUTION_LIMIT):
+    """ Solve the puzzle.
+
+    :return: ``(solution_number, wolf_indices)``. ``solution_number`` is at most ``limit``,
+             and ``wolf_indices`` is the sorted indices of the wolves,
+             if the solution is unique. Otherwise, ``None``.
+    """
+    total = puzzle.villager_number + puzzle.wolf_number + puzzle.lunatic_number
+    white_masks = [0] * total
+    black_masks = [0] * total
+    for from_index, to_index, code in puzzle.claims:
+        # The later claim overrides the former one, as in ``Player.result``.
+        white_masks[from_index] &= ~(1 << to_index)
+        black_masks[from_index] &= ~(1 << to_index)
+        if code == WHITE_CODE:
+            white_masks[from_index] |= 1 << to_index
+        else:
+            black_masks[from_index] |= 1 << to_index
+    role_solver = RoleSolver(ClaimMasks(white_masks, black_masks), puzzle.villager_number,
+                             puzzle.wolf_number, puzzle.lunatic_number)
+    solution_number = role_solver.count(limit)
+    if solution_number != 1:
+        return solution_number, None
+    _, wolf_mask = next(role_solver.iter_solutions())
+    return solution_number, mask_to_indices(wolf_mask)
+
+
+def verify_text(line_number, lines):
+    """ Parse and solve one puzzle.
+
+    :return: ``dict`` of the result, which is serializable into JSON.
+             ``status`` is ``"unique"``, ``"none"``, ``"multiple"``, or ``"error"``.
+             ``answer_matches`` is ``None`` if the answer is not stated.
+    """
+    record = {"line": line_number}
+    try:
+        puzzle = parse_puzzle(lines, line_number)
+    except ValueError as error:
+        record["status"] = "error"
+        record["error"] = " ".join(str(arg) for arg in error.args)
+        return record
+
+    solution_number, wolf_indices = solve(puzzle)
+    record["solutions"] = solution_number
+    record["status"] = {0: "none", 1: "unique"}.get(solution_number, "multiple")
+    record["wolf_indices"] = wolf_indices
+    if puzzle.wolf_indices is None:
+        record["answer_matches"] = None
+    else:
+        record["answer_matches"] = puzzle.wolf_indices == wolf_indices
+    return record
+
+
+def iter_verify(lines, jobs=None, chunksize=64):
+    """ Verify the puzzles in the lines, and yield the results in order.
+    The lines are read lazily, and the puzzles are solved across worker processes.
+
+    :param lines: iterable of ``str``, such as a file object.
+    :param jobs: the number of worker processes. If ``None``, all the cores are used.
+    :param chunksize: the number of puzzles sent to a worker at once.
+    :return: iterator of ``dict`` of :func:`verify_text`, with ``index`` of the puzzle.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    chunks = _iter_chunks(iter_puzzle_texts(lines), chunksize)
+    index = 0
+    for records in iter_bounded_map(_verify_chunk, chunks, jobs):
+        for record in records:
+            record["index"] = index
+            index += 1
+            yield record
+
+
+def _iter_chunks(items, chunksize):
+    chunk = list()
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+
+def _verify_chunk(chunk):
+    return [verify_text(line_number, lines) for line_number, lines in chunk]
+
+
+def create_parser():
+    """ Create argparser.
+    """
+    parser = argparse.ArgumentParser(description="Verifier of Werewolves' Puzzles.")
+    parser.add_argument('-input', type=str, default="-",
+                        help="the path of the puzzles in the markdown format ('-' for stdin)")
+    parser.add_argument('-jobs', type=int, default=None,
+                        help="the number of worker processes (default: all the cores)")
+    parser.add_argument('-chunksize', type=int, default=64,
+                        help="the number of puzzles sent to a worker at once")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = create_parser()
+    args = parser.parse_args()
+
+    if args.input == "-":
+        fp = sys.stdin
+    else:
+        fp = open(args.input, encoding="utf-8")
+
+    failures = 0
+    try:
+        for record in iter_verify(fp, args.jobs, args.chunksize):
+            if record["status"] != "unique" or record.get("answer_matches") is False:
+                failures += 1
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+    if failures:
+        print("{0} puzzles are not verified.".format(failures), file=sys.stderr)
+        sys.exit(1)